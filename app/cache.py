@@ -0,0 +1,77 @@
+import os
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, maxsize=4096, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if (entry := self._entries.get(key)) is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+registry = TTLCache(
+    maxsize=int(os.environ.get("REGISTRY_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("REGISTRY_CACHE_TTL", 300)),
+)
+
+
+def registry_key(database, collection, id):
+    return (database.name, collection, id)
+
+
+async def find_entity(database, collection, id):
+    key = registry_key(database, collection, id)
+    if (document := registry.get(key)) is not None:
+        return document
+    if (document := await database[collection].find_one({"_id": id})) is None:
+        return None
+    registry.set(key, document)
+    return document
+
+
+async def find_entities(database, collection, ids):
+    documents = {}
+    missing = []
+    for id in ids:
+        key = registry_key(database, collection, id)
+        if (document := registry.get(key)) is not None:
+            documents[id] = document
+        else:
+            missing.append(id)
+
+    if len(missing) != 0:
+        async for document in database[collection].find(
+            {"_id": {"$in": missing}}
+        ):
+            registry.set(
+                registry_key(database, collection, document["_id"]), document
+            )
+            documents[document["_id"]] = document
+    return documents
+
+
+def invalidate_entity(database, collection, id):
+    registry.invalidate(registry_key(database, collection, id))
@@ -0,0 +1,40 @@
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from app.times import to_utc
+
+
+READINGS_MEDIA_TYPE = "application/vnd.hydrangea.readings"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def accepts_columnar(accept):
+    return any(
+        media_type.split(";")[0].strip() == READINGS_MEDIA_TYPE
+        for media_type in accept.split(",")
+    )
+
+
+def epoch_microseconds(created_at):
+    return (to_utc(created_at) - EPOCH) // timedelta(microseconds=1)
+
+
+# Little-endian uint64 row count, then that many int64 UTC microsecond
+# timestamps, then that many float64 values. Both arrays start on an
+# 8-byte boundary so clients can map them without copying.
+def pack_readings(readings):
+    timestamps = array(
+        "q",
+        (epoch_microseconds(reading["created_at"]) for reading in readings),
+    )
+    values = array("d", (reading["value"] for reading in readings))
+    if sys.byteorder == "big":
+        timestamps.byteswap()
+        values.byteswap()
+    return (
+        struct.pack("<Q", len(timestamps))
+        + timestamps.tobytes()
+        + values.tobytes()
+    )
@@ -0,0 +1,130 @@
+import collections
+import itertools
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+
+
+CURSOR_OPTIONS = {"sort", "limit", "skip", "batch_size", "hint", "max_time_ms"}
+
+
+class ThreadedCursor:
+    chunk_size = 100
+
+    def __init__(self, open_cursor):
+        self._open_cursor = open_cursor
+        self._options = []
+        self._cursor = None
+        self._buffer = collections.deque()
+
+    def __getattr__(self, name):
+        if name not in CURSOR_OPTIONS:
+            raise AttributeError(name)
+
+        def option(*args, **kwargs):
+            self._options.append((name, args, kwargs))
+            return self
+
+        return option
+
+    def _open(self):
+        cursor = self._open_cursor()
+        for name, args, kwargs in self._options:
+            cursor = getattr(cursor, name)(*args, **kwargs)
+        return cursor
+
+    def _take(self, length):
+        if self._cursor is None:
+            self._cursor = self._open()
+        return list(itertools.islice(self._cursor, length))
+
+    async def to_list(self, length=None):
+        return await run_in_threadpool(self._take, length)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if len(self._buffer) == 0:
+            self._buffer.extend(await self.to_list(self.chunk_size))
+            if len(self._buffer) == 0:
+                raise StopAsyncIteration
+        return self._buffer.popleft()
+
+
+class ThreadedCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    @property
+    def name(self):
+        return self._collection.name
+
+    def find(self, *args, **kwargs):
+        return ThreadedCursor(lambda: self._collection.find(*args, **kwargs))
+
+    def aggregate(self, *args, **kwargs):
+        return ThreadedCursor(
+            lambda: self._collection.aggregate(*args, **kwargs)
+        )
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
+
+
+class ThreadedDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    @property
+    def name(self):
+        return self._database.name
+
+    def __getitem__(self, name):
+        return ThreadedCollection(self._database[name])
+
+    def __getattr__(self, name):
+        method = getattr(self._database, name)
+
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
+
+
+# Opt-in fallback that runs the blocking PyMongo driver in the threadpool
+# behind the same awaitable interface as Motor.
+class ThreadedClient:
+    def __init__(self, *args, **kwargs):
+        self._client = MongoClient(*args, **kwargs)
+
+    def __getitem__(self, name):
+        return ThreadedDatabase(self._client[name])
+
+    def close(self):
+        self._client.close()
+
+
+def connect(*args, **kwargs):
+    if os.environ.get("MONGO_DRIVER", "motor") == "pymongo":
+        return ThreadedClient(*args, **kwargs)
+    return AsyncIOMotorClient(*args, **kwargs)
+
+
+async def insert_unordered(collection, documents):
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        return {
+            error["index"]: error["errmsg"]
+            for error in e.details["writeErrors"]
+        }
+    return {}
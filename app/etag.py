@@ -0,0 +1,29 @@
+import hashlib
+import json
+
+from fastapi import Response, status
+from fastapi.encoders import jsonable_encoder
+
+
+def entity_tag(content):
+    raw = json.dumps(
+        jsonable_encoder(content), sort_keys=True, separators=(",", ":")
+    )
+    return f'"{hashlib.sha256(raw.encode()).hexdigest()}"'
+
+
+def matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def conditional(request, response, content):
+    etag = entity_tag(content)
+    if matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    response.headers["ETag"] = etag
+    return content
@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+import zlib
+
+from app.storage import reading_from_document
+
+EXPORT_FIELDS = ["_id", "sensor_id", "value", "created_at"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def ndjson_chunk(documents):
+    return "".join(
+        json.dumps({field: document.get(field) for field in EXPORT_FIELDS})
+        + "\n"
+        for document in documents
+    )
+
+
+def csv_chunk(documents, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        [document.get(field) for field in EXPORT_FIELDS]
+        for document in documents
+    )
+    return buffer.getvalue()
+
+
+async def export_chunks(cursor, format, batch_size):
+    if format == "csv":
+        yield csv_chunk([], header=True)
+    # Only one batch of documents is held at a time, however long the
+    # export runs.
+    while len(documents := await cursor.to_list(length=batch_size)) != 0:
+        documents = [reading_from_document(document) for document in documents]
+        if format == "csv":
+            yield csv_chunk(documents)
+        else:
+            yield ndjson_chunk(documents)
+
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        if len(compressed := compressor.compress(chunk.encode())) != 0:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding):
+    return any(
+        coding.split(";")[0].strip() == "gzip"
+        for coding in accept_encoding.split(",")
+    )
@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from app.database import connect
+from app.storage import ensure_timeseries
+
+
+INDEXES = {
+    "readings": [
+        IndexModel(
+            [
+                ("sensor_id", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            name="sensor_id_created_at_id",
+        ),
+        IndexModel(
+            [("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="created_at_id",
+        ),
+    ],
+    "scheduled_actions": [
+        IndexModel(
+            [
+                ("actuator_id", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            name="actuator_id_created_at_id",
+        ),
+        IndexModel(
+            [("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="created_at_id",
+        ),
+    ],
+    "reactive_actions": [
+        IndexModel(
+            [
+                ("actuator_id", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            name="actuator_id_created_at_id",
+        ),
+        IndexModel(
+            [("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="created_at_id",
+        ),
+    ],
+    "reading_rollups": [
+        IndexModel(
+            [
+                ("sensor_id", ASCENDING),
+                ("period", ASCENDING),
+                ("start", ASCENDING),
+            ],
+            name="sensor_id_period_start",
+        ),
+    ],
+    "commands": [
+        IndexModel(
+            [("executed", ASCENDING), ("updated_at", DESCENDING)],
+            name="executed_updated_at",
+        ),
+        IndexModel(
+            [
+                ("garden_id", ASCENDING),
+                ("executed", ASCENDING),
+                ("created_at", ASCENDING),
+            ],
+            name="garden_id_executed_created_at",
+        ),
+        IndexModel([("lease_id", ASCENDING)], name="lease_id"),
+    ],
+    "gardens": [
+        IndexModel([("pods._id", ASCENDING)], name="pods_id"),
+        IndexModel(
+            [("config_id", ASCENDING), ("updated_at", DESCENDING)],
+            name="config_id_updated_at",
+        ),
+        IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+    ],
+    "sensors": [
+        IndexModel(
+            [("garden_id", ASCENDING), ("updated_at", DESCENDING)],
+            name="garden_id_updated_at",
+        ),
+        IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+    ],
+    "scheduled_actuators": [
+        IndexModel(
+            [("garden_id", ASCENDING), ("updated_at", DESCENDING)],
+            name="garden_id_updated_at",
+        ),
+        IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+    ],
+    "reactive_actuators": [
+        IndexModel(
+            [("sensor_id", ASCENDING), ("updated_at", DESCENDING)],
+            name="sensor_id_updated_at",
+        ),
+        IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+    ],
+    "pods": [
+        IndexModel([("garden_id", ASCENDING)], name="garden_id"),
+    ],
+    "configs": [
+        IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+    ],
+    "latest_values": [
+        IndexModel([("garden_id", ASCENDING)], name="garden_id"),
+    ],
+}
+
+# Fields each route filters or sorts on, equality fields first.
+ROUTE_QUERIES = {
+    "list_readings": ("readings", ["created_at"]),
+    "find_readings": ("readings", ["sensor_id", "created_at"]),
+    "find_reading_series": ("readings", ["sensor_id", "created_at"]),
+    "export_readings": ("readings", ["sensor_id", "created_at"]),
+    "find_garden_sensors": ("sensors", ["garden_id"]),
+    "find_garden_latest": ("latest_values", ["garden_id"]),
+    "find_garden_scheduled_actuators": ("scheduled_actuators", ["garden_id"]),
+    "find_garden_reactive_actuators": ("reactive_actuators", ["sensor_id"]),
+    "find_reading_rollups": (
+        "reading_rollups",
+        ["sensor_id", "period", "start"],
+    ),
+    "list_scheduled_actions": ("scheduled_actions", ["created_at"]),
+    "find_scheduled_actions": (
+        "scheduled_actions",
+        ["actuator_id", "created_at"],
+    ),
+    "list_reactive_actions": ("reactive_actions", ["created_at"]),
+    "find_reactive_actions": (
+        "reactive_actions",
+        ["actuator_id", "created_at"],
+    ),
+    "list_commands": ("commands", ["executed", "updated_at"]),
+    "claim_commands": ("commands", ["garden_id", "executed", "created_at"]),
+    "update_pod": ("gardens", ["pods._id"]),
+    "list_pods": ("pods", ["garden_id"]),
+    "list_gardens": ("gardens", ["config_id", "updated_at"]),
+    "list_sensors": ("sensors", ["garden_id", "updated_at"]),
+    "list_scheduled_actuators": (
+        "scheduled_actuators",
+        ["garden_id", "updated_at"],
+    ),
+    "list_reactive_actuators": (
+        "reactive_actuators",
+        ["sensor_id", "updated_at"],
+    ),
+    "list_configs": ("configs", ["updated_at"]),
+}
+
+
+def index_fields(index):
+    return [field for field, _ in index.document["key"].items()]
+
+
+def is_covered(fields, indexes):
+    return any(
+        index_fields(index)[: len(fields)] == fields for index in indexes
+    )
+
+
+def uncovered_queries(indexes=INDEXES, route_queries=ROUTE_QUERIES):
+    return [
+        route
+        for route, (collection, fields) in route_queries.items()
+        if not is_covered(fields, indexes.get(collection, []))
+    ]
+
+
+async def ensure_indexes(database, indexes=INDEXES):
+    await ensure_timeseries(database)
+    await asyncio.gather(
+        *[
+            database[collection].create_indexes(models)
+            for collection, models in indexes.items()
+        ]
+    )
+
+
+async def missing_indexes(database, indexes=INDEXES):
+    missing = []
+    for collection, models in indexes.items():
+        information = await database[collection].index_information()
+        existing = [list(info["key"]) for info in information.values()]
+        for index in models:
+            if list(index.document["key"].items()) not in existing:
+                missing.append((collection, index.document["name"]))
+    return missing
+
+
+async def run(check):
+    client = connect(os.environ["ATLAS_URI"])
+    database = client[os.environ["DB_NAME"]]
+    try:
+        if not check:
+            await ensure_indexes(database)
+        return await missing_indexes(database)
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Create or check the indexes hydrangea's routes need."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="report missing indexes and uncovered queries without writing",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    missing = asyncio.run(run(args.check))
+    uncovered = uncovered_queries()
+
+    for collection, name in missing:
+        print(f"missing index {name} on {collection}")
+    for route in uncovered:
+        print(f"route {route} is not covered by an index")
+    return 1 if missing or uncovered else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
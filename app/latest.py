@@ -0,0 +1,71 @@
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.times import to_utc
+
+
+LATEST_TABLE_NAME = "latest_values"
+READING = "reading"
+SCHEDULED_ACTION = "scheduled_action"
+REACTIVE_ACTION = "reactive_action"
+REF_FIELDS = {
+    READING: "sensor_id",
+    SCHEDULED_ACTION: "actuator_id",
+    REACTIVE_ACTION: "actuator_id",
+}
+DUPLICATE_KEY = 11000
+
+
+def latest_id(kind, ref_id):
+    return f"{kind}:{ref_id}"
+
+
+def latest_updates(kind, documents, garden_ids):
+    newest = {}
+    for document in documents:
+        ref_id = document[REF_FIELDS[kind]]
+        at = to_utc(document["created_at"])
+        if ref_id not in newest or at >= newest[ref_id][0]:
+            newest[ref_id] = (at, document)
+
+    # The created_at guard makes an older document miss the filter, and its
+    # upsert then fails on the existing _id, so late arrivals never replace
+    # a newer value. On a tie the document received last wins.
+    return [
+        UpdateOne(
+            {"_id": latest_id(kind, ref_id), "created_at": {"$lte": at}},
+            {
+                "$set": {
+                    "kind": kind,
+                    "ref_id": ref_id,
+                    "garden_id": garden_ids.get(ref_id),
+                    "created_at": at,
+                    "document": document,
+                }
+            },
+            upsert=True,
+        )
+        for ref_id, (at, document) in newest.items()
+    ]
+
+
+async def update_latest(database, kind, documents, garden_ids):
+    if len(updates := latest_updates(kind, documents, garden_ids)) == 0:
+        return
+    try:
+        await database[LATEST_TABLE_NAME].bulk_write(updates, ordered=False)
+    except BulkWriteError as e:
+        if any(
+            error["code"] != DUPLICATE_KEY
+            for error in e.details["writeErrors"]
+        ):
+            raise
+
+
+async def find_latest(database, garden_id):
+    latest = {kind: [] for kind in REF_FIELDS}
+    async for value in database[LATEST_TABLE_NAME].find(
+        {"garden_id": garden_id}, {"kind": 1, "document": 1}
+    ):
+        latest[value["kind"]].append(value["document"])
+    return latest
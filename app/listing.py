@@ -0,0 +1,42 @@
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def projection_for(model):
+    return {
+        field.alias or name: 1 for name, field in model.model_fields.items()
+    }
+
+
+def fields_projection(fields, model):
+    if fields is None:
+        return None
+    allowed = projection_for(model)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if len(names) == 0 or any(name not in allowed for name in names):
+        raise HTTPException(status_code=400, detail="Invalid fields")
+    return {name: 1 for name in names}
+
+
+async def find_documents(collection, query, projection, limit):
+    return (
+        await collection.find(query, projection)
+        .sort("updated_at", -1)
+        .limit(limit)
+        .to_list(length=None)
+    )
+
+
+# Projected documents are missing required fields, so they skip response
+# model validation.
+def listing_response(documents, projection, headers=None):
+    if projection is None:
+        return documents
+    return JSONResponse(content=jsonable_encoder(documents), headers=headers)
+
+
+async def list_documents(collection, query, model, limit, fields):
+    projection = fields_projection(fields, model)
+    documents = await find_documents(collection, query, projection, limit)
+    return listing_response(documents, projection)
@@ -1,8 +1,12 @@
+import asyncio
 import os
 
 from fastapi import FastAPI, Request
 from fastapi.openapi.docs import get_swagger_ui_html
-from pymongo import MongoClient
+from app.database import connect
+from app.indexes import ensure_indexes
+from app.metrics import MetricsMiddleware, command_metrics
+from app.scheduler import scheduler
 from app.routes.garden import router as garden_router
 from app.routes.sensor import router as sensor_router
 from app.routes.scheduled_actuator import router as scheduled_actuator_router
@@ -10,6 +14,8 @@ from app.routes.reactive_actuator import router as reactive_actuator_router
 from app.routes.command import router as command_router
 from app.routes.config import router as config_router
 from app.routes.logging import router as logging_router
+from app.routes.metrics import router as metrics_router
+from app.routes.scheduler import router as scheduler_router
 from dotenv import load_dotenv
 from mangum import Mangum
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,6 +25,7 @@ load_dotenv()
 
 ATLAS_URI = os.environ["ATLAS_URI"]
 DB_NAME = os.environ["DB_NAME"]
+SCHEDULER_INTERVAL = float(os.environ.get("SCHEDULER_INTERVAL", 0))
 
 app = FastAPI()
 
@@ -31,16 +38,25 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event("startup")
-def startup_db_client():
-    app.mongodb_client = MongoClient(ATLAS_URI)
+async def startup_db_client():
+    app.mongodb_client = connect(ATLAS_URI, event_listeners=[command_metrics])
     app.database = app.mongodb_client[DB_NAME]
+    await ensure_indexes(app.database)
+    app.scheduler_task = None
+    if SCHEDULER_INTERVAL > 0:
+        app.scheduler_task = asyncio.create_task(
+            scheduler.run(app.database, SCHEDULER_INTERVAL)
+        )
 
 
 @app.on_event("shutdown")
-def shutdown_db_client():
+async def shutdown_db_client():
+    if app.scheduler_task is not None:
+        app.scheduler_task.cancel()
     app.mongodb_client.close()
 
 
@@ -65,6 +81,8 @@ app.include_router(
 app.include_router(command_router, tags=["commands"], prefix="/cmd")
 app.include_router(logging_router, tags=["logging"])
 app.include_router(config_router, tags=["configs"], prefix="/config")
+app.include_router(scheduler_router, tags=["scheduler"], prefix="/scheduler")
+app.include_router(metrics_router, tags=["metrics"])
 
 
 handler = Mangum(app)
@@ -0,0 +1,266 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from pymongo import monitoring
+
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+COMMAND_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# Motor and the threaded driver run commands in a copy of the caller's
+# context, so a command started for a request can find that request here.
+request_commands = contextvars.ContextVar("request_commands", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{bound:g}", cumulative
+        yield "+Inf", cumulative + self.counts[-1]
+
+
+def escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return ",".join(f'{name}="{escape(value)}"' for name, value in pairs)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.request_seconds = {}
+        self.response_bytes = {}
+        self.request_db_operations = {}
+        self.db_operations = defaultdict(int)
+        self.db_failures = defaultdict(int)
+        self.db_seconds = {}
+
+    def _observe(self, histograms, key, buckets, value):
+        if (histogram := histograms.get(key)) is None:
+            histogram = histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def record_request(self, method, route, status, seconds, size, commands):
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            self._observe(
+                self.request_seconds,
+                (method, route),
+                LATENCY_BUCKETS,
+                seconds,
+            )
+            self._observe(
+                self.response_bytes, (method, route), SIZE_BUCKETS, size
+            )
+            self._observe(
+                self.request_db_operations,
+                (method, route),
+                COMMAND_BUCKETS,
+                commands,
+            )
+
+    def record_command(self, collection, command, seconds, failed):
+        with self._lock:
+            self.db_operations[(collection, command)] += 1
+            if failed:
+                self.db_failures[(collection, command)] += 1
+            self._observe(
+                self.db_seconds,
+                (collection, command),
+                LATENCY_BUCKETS,
+                seconds,
+            )
+
+    def render(self):
+        lines = []
+
+        def counter(name, help, names, values):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(values.items()):
+                lines.append(f"{name}{{{labels(names, key)}}} {value}")
+
+        def histogram(name, help, names, histograms):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, value in sorted(histograms.items()):
+                for bound, count in value.samples():
+                    lines.append(
+                        f"{name}_bucket{{{labels(names, key, le=bound)}}} "
+                        f"{count}"
+                    )
+                lines.append(f"{name}_sum{{{labels(names, key)}}} {value.sum}")
+                lines.append(
+                    f"{name}_count{{{labels(names, key)}}} "
+                    f"{sum(value.counts)}"
+                )
+
+        with self._lock:
+            counter(
+                "hydrangea_http_requests_total",
+                "HTTP requests by route and status.",
+                ("method", "route", "status"),
+                self.requests,
+            )
+            histogram(
+                "hydrangea_http_request_duration_seconds",
+                "HTTP request latency by route.",
+                ("method", "route"),
+                self.request_seconds,
+            )
+            histogram(
+                "hydrangea_http_response_size_bytes",
+                "HTTP response body size by route.",
+                ("method", "route"),
+                self.response_bytes,
+            )
+            histogram(
+                "hydrangea_http_request_db_operations",
+                "Database commands per HTTP request by route.",
+                ("method", "route"),
+                self.request_db_operations,
+            )
+            counter(
+                "hydrangea_db_operations_total",
+                "Database commands by collection.",
+                ("collection", "command"),
+                self.db_operations,
+            )
+            counter(
+                "hydrangea_db_failures_total",
+                "Failed database commands by collection.",
+                ("collection", "command"),
+                self.db_failures,
+            )
+            histogram(
+                "hydrangea_db_operation_duration_seconds",
+                "Database command latency by collection.",
+                ("collection", "command"),
+                self.db_seconds,
+            )
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, metrics=metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        response = {"status": 500, "size": 0}
+        commands = {"count": 0}
+        token = request_commands.set(commands)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_commands.reset(token)
+            # Route templates keep the label set bounded; unmatched paths
+            # share one label instead of one per URL.
+            route = scope.get("route")
+            self.metrics.record_request(
+                scope["method"],
+                "unmatched" if route is None else route.path,
+                response["status"],
+                time.perf_counter() - started,
+                response["size"],
+                commands["count"],
+            )
+
+
+# getMore names its collection under "collection" rather than the
+# command name.
+def command_collection(event):
+    if event.command_name == "getMore":
+        return event.command.get("collection")
+    collection = event.command.get(event.command_name)
+    return collection if isinstance(collection, str) else None
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self, metrics=metrics):
+        self.metrics = metrics
+        self._collections = {}
+
+    def started(self, event):
+        collection = command_collection(event)
+        self._collections[(event.connection_id, event.request_id)] = collection
+        if (
+            collection is not None
+            and (commands := request_commands.get()) is not None
+        ):
+            commands["count"] += 1
+
+    def _finish(self, event, failed):
+        collection = self._collections.pop(
+            (event.connection_id, event.request_id), None
+        )
+        if collection is None:
+            return
+        self.metrics.record_command(
+            collection,
+            event.command_name,
+            event.duration_micros / 1000000,
+            failed,
+        )
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+
+command_metrics = CommandMetrics()
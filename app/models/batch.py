@@ -0,0 +1,41 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class BatchItemResult(BaseModel):
+    index: int = Field(...)
+    id: Optional[str] = Field(default=None, alias="_id")
+    status: int = Field(...)
+    detail: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class BatchResult(BaseModel):
+    inserted_count: int = Field(...)
+    failed_count: int = Field(...)
+    items: List[BatchItemResult] = Field(...)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "inserted_count": 1,
+                "failed_count": 1,
+                "items": [
+                    {
+                        "index": 0,
+                        "_id": "4c1d2b8e-6a0f-4f4e-9d1e-2b8f0e6a7c11",
+                        "status": 201,
+                        "detail": None,
+                    },
+                    {
+                        "index": 1,
+                        "_id": "9a3f5c21-7b44-4e0a-8c55-1f2e3d4c5b6a",
+                        "status": 404,
+                        "detail": "Sensor with ID abc not found",
+                    },
+                ],
+            }
+        }
@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 import pytz
@@ -12,6 +13,8 @@ class Command(BaseModel):
     type: str = Field(...)
     executed: str = Field(default="false")
     garden_id: str = Field(...)
+    lease_id: Optional[str] = None
+    leased_until: Optional[datetime] = None
     created_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
     updated_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
 
@@ -42,3 +45,41 @@ class CommandUpdate(BaseModel):
 
     class Config:
         json_schema_extra = {"example": {"executed": "true"}}
+
+
+class CommandClaim(BaseModel):
+    garden_id: str = Field(...)
+    limit: int = Field(default=10, gt=0)
+    lease_seconds: float = Field(default=60.0, gt=0)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "garden_id": "87808a32-a24c-4b70-ae2c-c46c586ea0c3",
+                "limit": 10,
+                "lease_seconds": 60.0,
+            }
+        }
+
+
+class CommandLease(BaseModel):
+    lease_id: str = Field(...)
+    leased_until: datetime = Field(...)
+    commands: List[Command] = Field(...)
+
+
+class CommandAck(BaseModel):
+    ids: List[str] = Field(...)
+    lease_id: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": ["66608a32-a24c-4b70-ae2c-c46c586ea0c3"],
+                "lease_id": "0b4c2d6e-1f3a-4b5c-8d7e-9f0a1b2c3d4e",
+            }
+        }
+
+
+class CommandAckResult(BaseModel):
+    acknowledged: int = Field(...)
@@ -86,7 +86,11 @@ class ConfigUpdate(BaseModel):
     sensor_schedule: Optional[List[SensorSchedule]]
     ra_schedule: Optional[List[RASchedule]]
     sa_schedule: Optional[List[SASchedule]]
-    updated_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
+    # Compiled schedules are revalidated against updated_at, so every update
+    # has to stamp a new one.
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(pytz.timezone("US/Eastern"))
+    )
 
     class Config:
         json_schema_extra = {
@@ -95,3 +99,38 @@ class ConfigUpdate(BaseModel):
                 "sensor_schedule": [{"sensor_id": "abc", "interval": 400}],
             }
         }
+
+
+class ActuatorState(BaseModel):
+    sa_id: str = Field(...)
+    on: bool = Field(...)
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+class ConfigState(BaseModel):
+    config_id: str = Field(...)
+    at: datetime = Field(...)
+    actuators: List[ActuatorState] = Field(...)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "config_id": "b67cd1cf-e113-40cf-a293-ba80251e03ce",
+                "at": "2023-02-18T08:15:00+00:00",
+                "actuators": [
+                    {
+                        "sa_id": "15a2a241-cf21-4365-af45-3d140712f2b8",
+                        "on": True,
+                        "since": "2023-02-18T08:09:50+00:00",
+                        "until": "2023-02-18T08:29:50+00:00",
+                    }
+                ],
+            }
+        }
+
+
+class Transition(BaseModel):
+    sa_id: str = Field(...)
+    at: datetime = Field(...)
+    on: bool = Field(...)
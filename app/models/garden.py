@@ -4,7 +4,12 @@ from typing import Optional, Union, List
 import pytz
 
 from pydantic import BaseModel, Field, field_validator
+from app.models.config import Config
+from app.models.logging import Reading, Reactive_Action, Scheduled_Action
 from app.models.pod import Pod, PodUpdate
+from app.models.reactive_actuator import Reactive_Actuator
+from app.models.scheduled_actuator import Scheduled_Actuator
+from app.models.sensor import Sensor
 
 
 class Garden(BaseModel):
@@ -72,3 +77,17 @@ class GardenUpdate(BaseModel):
                 ],
             }
         }
+
+
+class GardenLatest(BaseModel):
+    garden_id: str = Field(...)
+    readings: List[Reading] = Field(...)
+    scheduled_actions: List[Scheduled_Action] = Field(...)
+    reactive_actions: List[Reactive_Action] = Field(...)
+
+
+class GardenTree(Garden):
+    sensors: List[Sensor] = Field(...)
+    scheduled_actuators: List[Scheduled_Actuator] = Field(...)
+    reactive_actuators: List[Reactive_Actuator] = Field(...)
+    config: Optional[Config] = None
@@ -4,12 +4,16 @@ from datetime import datetime
 from pydantic import BaseModel, Field, field_validator
 
 
+def eastern_now():
+    return datetime.now(pytz.timezone("US/Eastern"))
+
+
 class Reading(BaseModel):
     id: str = Field(default_factory=uuid.uuid4, alias="_id")
     sensor_id: str = Field(...)
     value: float = Field(...)
-    created_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
-    updated_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
+    created_at: datetime = Field(default_factory=eastern_now)
+    updated_at: datetime = Field(default_factory=eastern_now)
 
     class Config:
         populate_by_name = True
@@ -30,8 +34,8 @@ class Scheduled_Action(BaseModel):
     id: str = Field(default_factory=uuid.uuid4, alias="_id")
     actuator_id: str = Field(...)
     data: str = Field(...)
-    created_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
-    updated_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
+    created_at: datetime = Field(default_factory=eastern_now)
+    updated_at: datetime = Field(default_factory=eastern_now)
 
     class Config:
         populate_by_name = True
@@ -52,8 +56,8 @@ class Reactive_Action(BaseModel):
     id: str = Field(default_factory=uuid.uuid4, alias="_id")
     actuator_id: str = Field(...)
     data: str = Field(...)
-    created_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
-    updated_at: datetime = datetime.now(pytz.timezone("US/Eastern"))
+    created_at: datetime = Field(default_factory=eastern_now)
+    updated_at: datetime = Field(default_factory=eastern_now)
 
     class Config:
         populate_by_name = True
@@ -68,3 +72,49 @@ class Reactive_Action(BaseModel):
         def number_validator(cls, values):
             values["updated_at"] = datetime.now(pytz.timezone("US/Eastern"))
             return values
+
+
+class ReadingBucket(BaseModel):
+    start: datetime = Field(...)
+    min: float = Field(...)
+    max: float = Field(...)
+    mean: float = Field(...)
+    count: int = Field(...)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start": "2023-02-17T20:00:00+00:00",
+                "min": 6.1,
+                "max": 6.4,
+                "mean": 6.25,
+                "count": 60,
+            }
+        }
+
+
+class ReadingRollup(BaseModel):
+    start: datetime = Field(...)
+    period: str = Field(...)
+    count: int = Field(...)
+    mean: float = Field(...)
+    stddev: float = Field(...)
+    min: float = Field(...)
+    max: float = Field(...)
+    first: float = Field(...)
+    last: float = Field(...)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start": "2023-02-17T00:00:00+00:00",
+                "period": "day",
+                "count": 288,
+                "mean": 6.25,
+                "stddev": 0.12,
+                "min": 5.9,
+                "max": 6.6,
+                "first": 6.1,
+                "last": 6.3,
+            }
+        }
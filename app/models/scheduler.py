@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class SchedulerStatus(BaseModel):
+    jobs: int = Field(...)
+    next_fire_at: Optional[datetime] = None
+    last_tick: Optional[datetime] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "jobs": 12,
+                "next_fire_at": "2023-02-18T08:10:00+00:00",
+                "last_tick": "2023-02-18T08:09:55+00:00",
+            }
+        }
@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from app.times import to_utc
+
+
+def encode_cursor(document):
+    created_at = document["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = to_utc(created_at).isoformat()
+    raw = json.dumps([created_at, document["_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError(f"Invalid cursor {cursor}")
+    if not isinstance(created_at, str) or not isinstance(id, str):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return created_at, id
+
+
+def after_cursor(query, cursor, time_value=None):
+    created_at, id = decode_cursor(cursor)
+    if time_value is not None:
+        created_at = time_value(created_at)
+    return {
+        **query,
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": id}},
+        ],
+    }
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from collections import defaultdict
+
+from dotenv import load_dotenv
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+
+from app.database import connect, insert_unordered
+
+
+PODS_TABLE_NAME = "pods"
+
+
+def pods_collection_enabled():
+    return os.environ.get("PODS_STORAGE", "embedded") == "collection"
+
+
+def pod_document(pod, garden_id):
+    return {"_id": str(uuid.uuid4()), **pod, "garden_id": garden_id}
+
+
+async def attach_pods(database, gardens):
+    pods = defaultdict(list)
+    async for pod in database[PODS_TABLE_NAME].find(
+        {"garden_id": {"$in": [garden["_id"] for garden in gardens]}}
+    ):
+        pods[pod["garden_id"]].append(pod)
+    for garden in gardens:
+        garden["pods"] = pods[garden["_id"]]
+    return gardens
+
+
+async def find_garden_with_pods(database, garden_id):
+    if (
+        garden := await database["gardens"].find_one({"_id": garden_id})
+    ) is None:
+        return None
+    (garden,) = await attach_pods(database, [garden])
+    return garden
+
+
+async def find_pods(database, garden_id):
+    return (
+        await database[PODS_TABLE_NAME]
+        .find({"garden_id": garden_id})
+        .to_list(length=None)
+    )
+
+
+async def insert_pods(database, garden_id, pods):
+    pods = [pod_document(pod, garden_id) for pod in pods]
+    if len(pods) != 0:
+        await database[PODS_TABLE_NAME].insert_many(pods)
+    return pods
+
+
+async def replace_pods(database, garden_id, pods):
+    pods = [pod_document(pod, garden_id) for pod in pods]
+    # Upserting before deleting means a failure part way leaves extra pods
+    # rather than a garden with none, and a retry converges.
+    if len(pods) != 0:
+        await database[PODS_TABLE_NAME].bulk_write(
+            [
+                ReplaceOne({"_id": pod["_id"]}, pod, upsert=True)
+                for pod in pods
+            ],
+            ordered=False,
+        )
+    await database[PODS_TABLE_NAME].delete_many(
+        {"garden_id": garden_id, "_id": {"$nin": [pod["_id"] for pod in pods]}}
+    )
+    return pods
+
+
+async def update_pod_document(database, pod_id, update):
+    return await database[PODS_TABLE_NAME].find_one_and_update(
+        {"_id": pod_id},
+        {"$set": update},
+        projection={"garden_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def migrate(database, batch_size=1000):
+    migrated = 0
+    gardens = database["gardens"].find(
+        {"pods": {"$type": "array", "$ne": []}}, {"pods": 1}
+    )
+    async for garden in gardens:
+        pods = [pod_document(pod, garden["_id"]) for pod in garden["pods"]]
+        for start in range(0, len(pods), batch_size):
+            end = start + batch_size
+            await insert_unordered(database[PODS_TABLE_NAME], pods[start:end])
+        migrated += len(pods)
+    return migrated
+
+
+async def embed(database, batch_size=1000):
+    embedded = 0
+    updates = []
+    groups = database[PODS_TABLE_NAME].aggregate(
+        [{"$group": {"_id": "$garden_id", "pods": {"$push": "$$ROOT"}}}]
+    )
+    async for group in groups:
+        updates.append(
+            UpdateOne({"_id": group["_id"]}, {"$set": {"pods": group["pods"]}})
+        )
+        embedded += len(group["pods"])
+        if len(updates) == batch_size:
+            await database["gardens"].bulk_write(updates, ordered=False)
+            updates = []
+    if len(updates) != 0:
+        await database["gardens"].bulk_write(updates, ordered=False)
+    return embedded
+
+
+async def run(batch_size, reverse=False):
+    client = connect(os.environ["ATLAS_URI"])
+    database = client[os.environ["DB_NAME"]]
+    try:
+        if reverse:
+            return await embed(database, batch_size)
+        return await migrate(database, batch_size)
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Copy garden pods between their embedded arrays and the "
+        "pods collection."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="number of pods or gardens to write per batch",
+    )
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        help="copy pods from the pods collection back into their gardens",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    copied = asyncio.run(run(args.batch_size, args.reverse))
+    if args.reverse:
+        print(f"copied {copied} pods back into gardens")
+    else:
+        print(f"copied {copied} pods to {PODS_TABLE_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
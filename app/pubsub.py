@@ -0,0 +1,104 @@
+import asyncio
+import contextlib
+import json
+import time
+from collections import defaultdict
+
+from fastapi.encoders import jsonable_encoder
+
+
+class Broker:
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._subscribers = defaultdict(set)
+
+    def publish(self, message, *topics):
+        queues = set()
+        for topic in topics:
+            queues.update(self._subscribers.get(topic, ()))
+        for queue in queues:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                pass
+
+    @contextlib.contextmanager
+    def subscribe(self, *topics):
+        queue = asyncio.Queue(maxsize=self.maxsize)
+        for topic in topics:
+            self._subscribers[topic].add(queue)
+        try:
+            yield queue
+        finally:
+            for topic in topics:
+                self._subscribers[topic].discard(queue)
+                if len(self._subscribers[topic]) == 0:
+                    del self._subscribers[topic]
+
+
+broker = Broker()
+
+
+def command_topic(garden_id):
+    return f"commands:{garden_id}"
+
+
+def sensor_topic(sensor_id):
+    return f"readings:sensor:{sensor_id}"
+
+
+def garden_topic(garden_id):
+    return f"readings:garden:{garden_id}"
+
+
+def publish_commands(commands):
+    for command in commands:
+        broker.publish(command, command_topic(command["garden_id"]))
+
+
+def publish_readings(readings, garden_ids):
+    for reading in readings:
+        broker.publish(
+            reading,
+            sensor_topic(reading["sensor_id"]),
+            garden_topic(garden_ids.get(reading["sensor_id"])),
+        )
+
+
+def server_sent_event(event, document):
+    data = json.dumps(jsonable_encoder(document))
+    return f"event: {event}\nid: {document['_id']}\ndata: {data}\n\n"
+
+
+async def next_message(queue, timeout):
+    try:
+        return await asyncio.wait_for(queue.get(), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def event_stream(
+    request, queue, event, timeout, heartbeat, backlog=(), refresh=None
+):
+    deadline = time.monotonic() + timeout
+    sent = set()
+    for document in backlog:
+        sent.add(document["_id"])
+        yield server_sent_event(event, document)
+    while (remaining := deadline - time.monotonic()) > 0:
+        if await request.is_disconnected():
+            return
+        document = await next_message(queue, min(heartbeat, remaining))
+        if document is not None:
+            if document["_id"] not in sent:
+                sent.add(document["_id"])
+                yield server_sent_event(event, document)
+            continue
+        # Documents written by other instances never reach this broker, so
+        # a quiet heartbeat re-reads them from the database when it can.
+        if refresh is not None:
+            for document in await refresh():
+                if document["_id"] not in sent:
+                    sent.add(document["_id"])
+                    yield server_sent_event(event, document)
+        yield ": keep-alive\n\n"
@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from pymongo import ReplaceOne, UpdateOne
+
+from app.database import connect
+from app.storage import readings_collection
+from app.times import to_utc
+
+
+ROLLUP_TABLE_NAME = "reading_rollups"
+ROLLUP_PERIODS = {"hour": 3600, "day": 86400}
+
+
+def bucket_start(created_at, seconds):
+    timestamp = to_utc(created_at).timestamp()
+    return datetime.fromtimestamp(
+        timestamp - timestamp % seconds, timezone.utc
+    )
+
+
+def rollup_id(sensor_id, period, start):
+    return f"{sensor_id}:{period}:{start.isoformat()}"
+
+
+def add_reading(buckets, reading, received, index):
+    at = to_utc(reading["created_at"])
+    value = reading["value"]
+    # Readings stamped with the same created_at are ordered by when the
+    # server received them, so the newer one wins "last" instead of the
+    # larger value.
+    sample = {
+        "at": at,
+        "received": received,
+        "index": index,
+        "value": value,
+    }
+    for period, seconds in ROLLUP_PERIODS.items():
+        key = (reading["sensor_id"], period, bucket_start(at, seconds))
+        if (bucket := buckets.get(key)) is None:
+            buckets[key] = {
+                "count": 1,
+                "sum": value,
+                "sum_of_squares": value * value,
+                "min": value,
+                "max": value,
+                "first": sample,
+                "last": sample,
+            }
+            continue
+        bucket["count"] += 1
+        bucket["sum"] += value
+        bucket["sum_of_squares"] += value * value
+        bucket["min"] = min(bucket["min"], value)
+        bucket["max"] = max(bucket["max"], value)
+        if at < bucket["first"]["at"]:
+            bucket["first"] = sample
+        if at >= bucket["last"]["at"]:
+            bucket["last"] = sample
+
+
+def rollup_updates(readings, received=None):
+    received = time.time_ns() if received is None else received
+    buckets = {}
+    for index, reading in enumerate(readings):
+        add_reading(buckets, reading, received, index)
+
+    # Embedded documents compare field by field, so $min/$max on
+    # {"at", "received", "index", "value"} keep the earliest and latest
+    # sample even when readings arrive out of order.
+    return [
+        UpdateOne(
+            {"_id": rollup_id(sensor_id, period, start)},
+            {
+                "$setOnInsert": {
+                    "sensor_id": sensor_id,
+                    "period": period,
+                    "start": start,
+                },
+                "$inc": {
+                    "count": bucket["count"],
+                    "sum": bucket["sum"],
+                    "sum_of_squares": bucket["sum_of_squares"],
+                },
+                "$min": {"min": bucket["min"], "first": bucket["first"]},
+                "$max": {"max": bucket["max"], "last": bucket["last"]},
+            },
+            upsert=True,
+        )
+        for (sensor_id, period, start), bucket in buckets.items()
+    ]
+
+
+async def update_rollups(database, readings):
+    if len(updates := rollup_updates(readings)) != 0:
+        await database[ROLLUP_TABLE_NAME].bulk_write(updates, ordered=False)
+
+
+def summarize(rollup):
+    mean = rollup["sum"] / rollup["count"]
+    variance = rollup["sum_of_squares"] / rollup["count"] - mean * mean
+    return {
+        "start": to_utc(rollup["start"]),
+        "period": rollup["period"],
+        "count": rollup["count"],
+        "mean": mean,
+        "stddev": math.sqrt(max(variance, 0.0)),
+        "min": rollup["min"],
+        "max": rollup["max"],
+        "first": rollup["first"]["value"],
+        "last": rollup["last"]["value"],
+    }
+
+
+def rollup_document(key, bucket):
+    sensor_id, period, start = key
+    return {
+        "_id": rollup_id(sensor_id, period, start),
+        "sensor_id": sensor_id,
+        "period": period,
+        "start": start,
+        **bucket,
+    }
+
+
+async def write_rollups(database, buckets, batch_size):
+    replacements = [
+        ReplaceOne({"_id": document["_id"]}, document, upsert=True)
+        for document in (
+            rollup_document(key, bucket) for key, bucket in buckets.items()
+        )
+    ]
+    for start in range(0, len(replacements), batch_size):
+        end = start + batch_size
+        await database[ROLLUP_TABLE_NAME].bulk_write(
+            replacements[start:end], ordered=False
+        )
+    return len(replacements)
+
+
+# Rebuilds each sensor's buckets from its raw readings and replaces the
+# stored rollups, so running it again is safe. Readings are sorted by
+# sensor, which keeps one sensor's buckets in memory at a time.
+async def backfill(database, batch_size=1000):
+    rebuilt = 0
+    sensor_id = None
+    buckets = {}
+    index = 0
+    cursor = (
+        readings_collection(database)
+        .find({}, {"sensor_id": 1, "value": 1, "created_at": 1})
+        .sort([("sensor_id", 1), ("created_at", 1)])
+        .batch_size(batch_size)
+    )
+    async for reading in cursor:
+        if reading["sensor_id"] != sensor_id:
+            rebuilt += await write_rollups(database, buckets, batch_size)
+            sensor_id = reading["sensor_id"]
+            buckets = {}
+        add_reading(buckets, reading, 0, index)
+        index += 1
+    rebuilt += await write_rollups(database, buckets, batch_size)
+    return rebuilt
+
+
+async def run(batch_size):
+    client = connect(os.environ["ATLAS_URI"])
+    database = client[os.environ["DB_NAME"]]
+    try:
+        return await backfill(database, batch_size)
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rebuild hourly and daily rollups from stored readings."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="number of readings to read and rollups to write per batch",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    rebuilt = asyncio.run(run(args.batch_size))
+    print(f"rebuilt {rebuilt} rollups in {ROLLUP_TABLE_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,238 @@
+from datetime import datetime, timedelta, timezone
 from typing import List
+import time
+import uuid
+import pytz
 
-from fastapi import APIRouter, Body, HTTPException, Request, status
+from fastapi import APIRouter, Body, HTTPException, Request, Query, status
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pymongo import ReturnDocument
 
-from app.models.command import Command, CommandUpdate
+from app.database import insert_unordered
+from app.models.command import (
+    Command,
+    CommandAck,
+    CommandAckResult,
+    CommandClaim,
+    CommandLease,
+    CommandUpdate,
+)
+from app.pubsub import (
+    broker,
+    command_topic,
+    event_stream,
+    next_message,
+    publish_commands,
+)
 
 
 router = APIRouter()
 
 
+def available_commands(garden_id, now):
+    return {
+        "garden_id": garden_id,
+        "executed": "false",
+        "$or": [{"leased_until": None}, {"leased_until": {"$lte": now}}],
+    }
+
+
+async def pending_commands(database, garden_id, limit):
+    return (
+        await database["commands"]
+        .find(available_commands(garden_id, datetime.now(timezone.utc)))
+        .sort("created_at", 1)
+        .limit(limit)
+        .to_list(length=None)
+    )
+
+
 @router.post(
     "/",
     response_description="Create new commands",
     status_code=status.HTTP_201_CREATED,
     response_model=List[Command],
 )
-def create_command(request: Request, commands: List[Command] = Body(...)):
-    created_cmds = []
-    for command in commands:
-        cmd = jsonable_encoder(command)
-        new_cmd = request.app.database["commands"].insert_one(cmd)
-        created_cmd = request.app.database["commands"].find_one(
-            {"_id": new_cmd.inserted_id}
+async def create_command(
+    request: Request, commands: List[Command] = Body(...)
+):
+    # Leases are only granted by /claim, which stores leased_until as a date
+    # that available_commands can compare.
+    commands = [
+        {**jsonable_encoder(command), "lease_id": None, "leased_until": None}
+        for command in commands
+    ]
+    if len(commands) == 0:
+        return commands
+
+    errors = await insert_unordered(request.app.database["commands"], commands)
+    publish_commands(
+        [
+            command
+            for index, command in enumerate(commands)
+            if index not in errors
+        ]
+    )
+    if len(errors) == 0:
+        return commands
+
+    # The rest of the batch is already written, so the error lists only the
+    # commands that were rejected and a retry can resend just those.
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=[
+            {"index": index, "id": commands[index]["_id"], "detail": errmsg}
+            for index, errmsg in errors.items()
+        ],
+    )
+
+
+@router.post(
+    "/claim",
+    response_description="Lease pending commands for a garden",
+    response_model=CommandLease,
+)
+async def claim_commands(request: Request, claim: CommandClaim = Body(...)):
+    now = datetime.now(timezone.utc)
+    lease_id = str(uuid.uuid4())
+    leased_until = now + timedelta(seconds=claim.lease_seconds)
+    available = available_commands(claim.garden_id, now)
+
+    candidates = (
+        await request.app.database["commands"]
+        .find(available, {"_id": 1})
+        .sort("created_at", 1)
+        .limit(claim.limit)
+        .to_list(length=None)
+    )
+    commands = []
+    if len(candidates) != 0:
+        # Re-checking availability in the update filter makes each command
+        # go to exactly one of several workers claiming at the same time.
+        await request.app.database["commands"].update_many(
+            {
+                **available,
+                "_id": {"$in": [command["_id"] for command in candidates]},
+            },
+            {"$set": {"lease_id": lease_id, "leased_until": leased_until}},
         )
-        created_cmds.append(created_cmd)
-    return created_cmds
+        commands = (
+            await request.app.database["commands"]
+            .find({"lease_id": lease_id})
+            .sort("created_at", 1)
+            .to_list(length=None)
+        )
+
+    return {
+        "lease_id": lease_id,
+        "leased_until": leased_until,
+        "commands": commands,
+    }
+
+
+@router.post(
+    "/ack",
+    response_description="Mark leased commands as executed",
+    response_model=CommandAckResult,
+)
+async def acknowledge_commands(request: Request, ack: CommandAck = Body(...)):
+    query = {"_id": {"$in": ack.ids}}
+    if ack.lease_id is not None:
+        query["lease_id"] = ack.lease_id
+
+    update_result = await request.app.database["commands"].update_many(
+        query,
+        {
+            "$set": {
+                "executed": "true",
+                "updated_at": jsonable_encoder(
+                    datetime.now(pytz.timezone("US/Eastern"))
+                ),
+            }
+        },
+    )
+    return {"acknowledged": update_result.modified_count}
 
 
 @router.get(
     "/", response_description="List commands", response_model=List[Command]
 )
-def list_commands(request: Request, limit: int = 1000, executed="false"):
-    commands = list(
-        request.app.database["commands"].find({"executed": executed})
+async def list_commands(
+    request: Request,
+    limit: int = Query(default=1000, gt=0),
+    executed="false",
+):
+    return (
+        await request.app.database["commands"]
+        .find({"executed": executed})
+        .sort("updated_at", -1)
+        .limit(limit)
+        .to_list(length=None)
     )
-    commands.sort(key=lambda r: r["updated_at"], reverse=True)
-    return commands[:limit]
+
+
+@router.get(
+    "/feed/{garden_id}",
+    response_description="Wait for pending commands for a garden",
+    response_model=List[Command],
+)
+async def poll_commands(
+    garden_id: str,
+    request: Request,
+    limit: int = Query(default=100, gt=0),
+    timeout: float = Query(default=25.0, ge=0, le=60),
+    poll: float = Query(default=2.0, ge=0.5),
+):
+    deadline = time.monotonic() + timeout
+    with broker.subscribe(command_topic(garden_id)) as queue:
+        commands = await pending_commands(
+            request.app.database, garden_id, limit
+        )
+        # The broker only wakes waiters in this process, so the feed also
+        # re-queries every poll seconds to pick up commands written by other
+        # instances.
+        while (
+            len(commands) == 0
+            and (remaining := deadline - time.monotonic()) > 0
+        ):
+            await next_message(queue, min(poll, remaining))
+            commands = await pending_commands(
+                request.app.database, garden_id, limit
+            )
+    return commands
+
+
+@router.get(
+    "/stream/{garden_id}",
+    response_description="Stream new commands for a garden as events",
+    response_class=StreamingResponse,
+)
+async def stream_commands(
+    garden_id: str,
+    request: Request,
+    timeout: float = Query(default=300.0, gt=0, le=3600),
+    heartbeat: float = Query(default=15.0, gt=0),
+):
+    async def events():
+        with broker.subscribe(command_topic(garden_id)) as queue:
+            backlog = await pending_commands(
+                request.app.database, garden_id, 1000
+            )
+            async for chunk in event_stream(
+                request,
+                queue,
+                "command",
+                timeout,
+                heartbeat,
+                backlog,
+                refresh=lambda: pending_commands(
+                    request.app.database, garden_id, 1000
+                ),
+            ):
+                yield chunk
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @router.get(
@@ -43,9 +240,9 @@ def list_commands(request: Request, limit: int = 1000, executed="false"):
     response_description="Get a single command by id",
     response_model=Command,
 )
-def find_command(id: str, request: Request):
+async def find_command(id: str, request: Request):
     if (
-        command := request.app.database["commands"].find_one({"_id": id})
+        command := await request.app.database["commands"].find_one({"_id": id})
     ) is not None:
         return command
 
@@ -58,24 +255,25 @@ def find_command(id: str, request: Request):
 @router.put(
     "/{id}", response_description="Update a command", response_model=Command
 )
-def update_command(id: str, request: Request, cmd: CommandUpdate = Body(...)):
+async def update_command(
+    id: str, request: Request, cmd: CommandUpdate = Body(...)
+):
     cmd = {k: v for k, v in cmd.dict().items() if v is not None}
 
     if len(cmd) >= 2:
-        update_result = request.app.database["commands"].update_one(
-            {"_id": id}, {"$set": cmd}
+        updated_cmd = await request.app.database[
+            "commands"
+        ].find_one_and_update(
+            {"_id": id},
+            {"$set": cmd},
+            return_document=ReturnDocument.AFTER,
         )
-
-        if update_result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Nothing was updated",
-            )
-
-    if (
-        existing_cmd := request.app.database["commands"].find_one({"_id": id})
-    ) is not None:
-        return existing_cmd
+    else:
+        updated_cmd = await request.app.database["commands"].find_one(
+            {"_id": id}
+        )
+    if updated_cmd is not None:
+        return updated_cmd
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -1,13 +1,34 @@
-from typing import List
-
-from fastapi import APIRouter, Body, HTTPException, Request, status
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import (
+    APIRouter,
+    Body,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
 
-
+from app.etag import conditional
+from app.listing import (
+    fields_projection,
+    find_documents,
+    listing_response,
+)
 from app.models.config import (
     Config,
+    ConfigState,
     ConfigUpdate,
+    Transition,
 )
+from app.schedule import compiled_schedule, invalidate_schedule
+from app.rules import rules
+from app.scheduler import scheduler
+from app.times import to_utc
 
 
 router = APIRouter()
@@ -22,23 +43,35 @@ CONFIG_TABLE_NAME = "configs"
     status_code=status.HTTP_201_CREATED,
     response_model=Config,
 )
-def create_config(request: Request, config: Config = Body(...)):
+async def create_config(request: Request, config: Config = Body(...)):
     conf = jsonable_encoder(config)
-    new_config = request.app.database[CONFIG_TABLE_NAME].insert_one(conf)
-    created_config = request.app.database[CONFIG_TABLE_NAME].find_one(
-        {"_id": new_config.inserted_id}
-    )
+    await request.app.database[CONFIG_TABLE_NAME].insert_one(conf)
+    scheduler.invalidate()
+    rules.invalidate()
 
-    return created_config
+    return conf
 
 
 @router.get(
     "/", response_description="List configs", response_model=List[Config]
 )
-def list_configs(request: Request, limit: int = 1000):
-    configs = list(request.app.database[CONFIG_TABLE_NAME].find())
-    configs.sort(key=lambda r: r["updated_at"], reverse=True)
-    return configs[:limit]
+async def list_configs(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=1000, gt=0),
+    fields: Optional[str] = None,
+):
+    projection = fields_projection(fields, Config)
+    configs = await find_documents(
+        request.app.database[CONFIG_TABLE_NAME], {}, projection, limit
+    )
+    if isinstance(
+        content := conditional(request, response, configs), Response
+    ):
+        return content
+    return listing_response(
+        content, projection, {"ETag": response.headers["ETag"]}
+    )
 
 
 @router.get(
@@ -46,11 +79,61 @@ def list_configs(request: Request, limit: int = 1000):
     response_description="Get a single config by id",
     response_model=Config,
 )
-def find_config(id: str, request: Request):
+async def find_config(id: str, request: Request, response: Response):
     if (
-        config := request.app.database[CONFIG_TABLE_NAME].find_one({"_id": id})
+        config := await request.app.database[CONFIG_TABLE_NAME].find_one(
+            {"_id": id}
+        )
     ) is not None:
-        return config
+        return conditional(request, response, config)
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Config with ID {id} not found",
+    )
+
+
+@router.get(
+    "/{id}/state",
+    response_description="Get the scheduled actuator states at a time",
+    response_model=ConfigState,
+)
+async def find_config_state(
+    id: str, request: Request, at: Optional[datetime] = None
+):
+    if (
+        schedule := await compiled_schedule(request.app.database, id)
+    ) is not None:
+        at = datetime.now(timezone.utc) if at is None else to_utc(at)
+        return {"config_id": id, "at": at, "actuators": schedule.state(at)}
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Config with ID {id} not found",
+    )
+
+
+@router.get(
+    "/{id}/transitions",
+    response_description="List scheduled actuator transitions in a range",
+    response_model=List[Transition],
+)
+async def list_config_transitions(
+    id: str,
+    request: Request,
+    start: datetime = Query(alias="from"),
+    end: datetime = Query(alias="to"),
+    limit: int = Query(default=1000, gt=0),
+):
+    if to_utc(end) <= to_utc(start):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid time range",
+        )
+    if (
+        schedule := await compiled_schedule(request.app.database, id)
+    ) is not None:
+        return schedule.transitions(start, end, limit)
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -61,23 +144,28 @@ def find_config(id: str, request: Request):
 @router.put(
     "/{id}", response_description="Update a config", response_model=Config
 )
-def update_config(id: str, request: Request, config: ConfigUpdate = Body(...)):
+async def update_config(
+    id: str, request: Request, config: ConfigUpdate = Body(...)
+):
     config = {k: v for k, v in config.dict().items() if v is not None}
+
     if len(config) >= 1:
-        update_result = request.app.database[CONFIG_TABLE_NAME].update_one(
-            {"_id": id}, {"$set": config}
+        updated_config = await request.app.database[
+            CONFIG_TABLE_NAME
+        ].find_one_and_update(
+            {"_id": id},
+            {"$set": config},
+            return_document=ReturnDocument.AFTER,
         )
-        if update_result.matched_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Config with ID {id} not found",
-            )
-    if (
-        existing_config := request.app.database[CONFIG_TABLE_NAME].find_one(
-            {"_id": id}
-        )
-    ) is not None:
-        return existing_config
+        invalidate_schedule(request.app.database, id)
+        scheduler.invalidate()
+        rules.invalidate()
+    else:
+        updated_config = await request.app.database[
+            CONFIG_TABLE_NAME
+        ].find_one({"_id": id})
+    if updated_config is not None:
+        return updated_config
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -1,10 +1,44 @@
-from typing import List
+import asyncio
+from typing import List, Optional
 
-from fastapi import APIRouter, Body, HTTPException, Request, status
+from fastapi import (
+    APIRouter,
+    Body,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
 
+from app.cache import find_entity, invalidate_entity
+from app.etag import conditional
+from app.latest import (
+    REACTIVE_ACTION,
+    READING,
+    SCHEDULED_ACTION,
+    find_latest,
+)
+from app.listing import (
+    fields_projection,
+    find_documents,
+    listing_response,
+)
 from app.models.pod import Pod, PodUpdate
-from app.models.garden import Garden, GardenUpdate
+from app.models.garden import Garden, GardenLatest, GardenTree, GardenUpdate
+from app.pods import (
+    attach_pods,
+    find_garden_with_pods,
+    find_pods,
+    insert_pods,
+    pods_collection_enabled,
+    replace_pods,
+    update_pod_document,
+)
+from app.rules import rules
+from app.scheduler import scheduler
 
 
 router = APIRouter()
@@ -16,23 +50,41 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     response_model=Garden,
 )
-def create_garden(request: Request, garden: Garden = Body(...)):
+async def create_garden(request: Request, garden: Garden = Body(...)):
     garden = jsonable_encoder(garden)
-    new_garden = request.app.database["gardens"].insert_one(garden)
-    created_garden = request.app.database["gardens"].find_one(
-        {"_id": new_garden.inserted_id}
-    )
+    if pods_collection_enabled():
+        pods = garden.pop("pods", None) or []
+        await request.app.database["gardens"].insert_one(garden)
+        garden["pods"] = await insert_pods(
+            request.app.database, garden["_id"], pods
+        )
+    else:
+        await request.app.database["gardens"].insert_one(garden)
+    scheduler.invalidate()
+    rules.invalidate()
 
-    return created_garden
+    return garden
 
 
 @router.get(
     "/", response_description="List gardens", response_model=List[Garden]
 )
-def list_gardens(request: Request, limit: int = 1000):
-    gardens = list(request.app.database["gardens"].find())
-    gardens.sort(key=lambda r: r["updated_at"], reverse=True)
-    return gardens[:limit]
+async def list_gardens(
+    request: Request,
+    limit: int = Query(default=1000, gt=0),
+    config_id: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    query = {} if config_id is None else {"config_id": config_id}
+    projection = fields_projection(fields, Garden)
+    gardens = await find_documents(
+        request.app.database["gardens"], query, projection, limit
+    )
+    if pods_collection_enabled() and (
+        projection is None or "pods" in projection
+    ):
+        await attach_pods(request.app.database, gardens)
+    return listing_response(gardens, projection)
 
 
 @router.get(
@@ -40,11 +92,13 @@ def list_gardens(request: Request, limit: int = 1000):
     response_description="Get a single garden by id",
     response_model=Garden,
 )
-def find_garden(id: str, request: Request):
-    if (
-        garden := request.app.database["gardens"].find_one({"_id": id})
-    ) is not None:
-        return garden
+async def find_garden(id: str, request: Request, response: Response):
+    if pods_collection_enabled():
+        garden = await find_garden_with_pods(request.app.database, id)
+    else:
+        garden = await request.app.database["gardens"].find_one({"_id": id})
+    if garden is not None:
+        return conditional(request, response, garden)
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -57,11 +111,82 @@ def find_garden(id: str, request: Request):
     response_description="List all pods in the garden",
     response_model=List[Pod],
 )
-def list_pods(id: str, request: Request):
-    if (
-        garden := request.app.database["gardens"].find_one({"_id": id})
+async def list_pods(id: str, request: Request, response: Response):
+    if pods_collection_enabled():
+        if await find_entity(request.app.database, "gardens", id) is not None:
+            pods = await find_pods(request.app.database, id)
+            return conditional(request, response, pods)
+    elif (
+        garden := await request.app.database["gardens"].find_one(
+            {"_id": id}, {"pods": 1}
+        )
     ) is not None:
-        return garden["pods"]
+        return conditional(request, response, garden["pods"])
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Garden with ID {id} not found",
+    )
+
+
+@router.get(
+    "/{id}/tree",
+    response_description="Get a garden with its devices and config",
+    response_model=GardenTree,
+)
+async def find_garden_tree(id: str, request: Request):
+    database = request.app.database
+    if (garden := await database["gardens"].find_one({"_id": id})) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Garden with ID {id} not found",
+        )
+
+    # Three round trips however large the garden is: the garden, then its
+    # sensors, scheduled actuators and config together, then the reactive
+    # actuators, which hang off the sensors.
+    queries = [
+        database["sensors"].find({"garden_id": id}).to_list(length=None),
+        database["scheduled_actuators"]
+        .find({"garden_id": id})
+        .to_list(length=None),
+        database["configs"].find_one({"_id": garden.get("config_id")}),
+    ]
+    if pods_collection_enabled():
+        queries.append(find_pods(database, id))
+    sensors, scheduled_actuators, config, *pods = await asyncio.gather(
+        *queries
+    )
+    if len(pods) != 0:
+        garden["pods"] = pods[0]
+    reactive_actuators = (
+        await database["reactive_actuators"]
+        .find({"sensor_id": {"$in": [sensor["_id"] for sensor in sensors]}})
+        .to_list(length=None)
+    )
+    return {
+        **garden,
+        "sensors": sensors,
+        "scheduled_actuators": scheduled_actuators,
+        "reactive_actuators": reactive_actuators,
+        "config": config,
+    }
+
+
+@router.get(
+    "/{id}/latest",
+    response_description="Get the latest reading and action per device",
+    response_model=GardenLatest,
+)
+async def find_garden_latest(id: str, request: Request):
+    if await find_entity(request.app.database, "gardens", id) is not None:
+        latest = await find_latest(request.app.database, id)
+        return {
+            "garden_id": id,
+            "readings": latest[READING],
+            "scheduled_actions": latest[SCHEDULED_ACTION],
+            "reactive_actions": latest[REACTIVE_ACTION],
+        }
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -72,24 +197,37 @@ def list_pods(id: str, request: Request):
 @router.put(
     "/{id}", response_description="Update a garden", response_model=Garden
 )
-def update_garden(id: str, request: Request, garden: GardenUpdate = Body(...)):
+async def update_garden(
+    id: str, request: Request, garden: GardenUpdate = Body(...)
+):
+    pods = garden.pods
     garden = {k: v for k, v in garden.dict().items() if v is not None}
+    if pods_collection_enabled():
+        garden.pop("pods", None)
+
     if len(garden) >= 1:
-        update_result = request.app.database["gardens"].update_one(
-            {"_id": id}, {"$set": garden}
+        updated_garden = await request.app.database[
+            "gardens"
+        ].find_one_and_update(
+            {"_id": id},
+            {"$set": garden},
+            return_document=ReturnDocument.AFTER,
         )
-        if update_result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Nothing was updated",
-            )
-
-    if (
-        existing_garden := request.app.database["gardens"].find_one(
+        invalidate_entity(request.app.database, "gardens", id)
+        scheduler.invalidate()
+        rules.invalidate()
+    else:
+        updated_garden = await request.app.database["gardens"].find_one(
             {"_id": id}
         )
-    ) is not None:
-        return existing_garden
+    if updated_garden is not None and pods_collection_enabled():
+        if pods is not None:
+            await replace_pods(
+                request.app.database, id, jsonable_encoder(pods)
+            )
+        await attach_pods(request.app.database, [updated_garden])
+    if updated_garden is not None:
+        return updated_garden
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -100,24 +238,39 @@ def update_garden(id: str, request: Request, garden: GardenUpdate = Body(...)):
 @router.put(
     "/pod/{pod_id}", response_description="Update a pod", response_model=Garden
 )
-def update_pod(pod_id: str, request: Request, pod: PodUpdate = Body(...)):
+async def update_pod(
+    pod_id: str, request: Request, pod: PodUpdate = Body(...)
+):
+    if pods_collection_enabled():
+        update = {k: v for k, v in dict(pod).items() if v is not None}
+        if (
+            updated_pod := await update_pod_document(
+                request.app.database, pod_id, update
+            )
+        ) is not None and (
+            garden := await find_garden_with_pods(
+                request.app.database, updated_pod["garden_id"]
+            )
+        ) is not None:
+            invalidate_entity(request.app.database, "gardens", garden["_id"])
+            return garden
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Pod with ID {pod_id} not found",
+        )
+
     query = {"pods._id": pod_id}
     update = {f"pods.$.{k}": v for k, v in dict(pod).items() if v is not None}
-    if (
-        pod := request.app.database["gardens"].find_one(
-            query, {"_id": 0, "pods": 1}
-        )
-    ) is not None:
-        if len(update) >= 1:
-            update_result = request.app.database["gardens"].update_one(
-                query, {"$set": update}
+    if len(update) >= 1:
+        if (
+            garden := await request.app.database[
+                "gardens"
+            ].find_one_and_update(
+                query, {"$set": update}, return_document=ReturnDocument.AFTER
             )
-            if update_result.modified_count == 0:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Nothing was updated",
-                )
-            return request.app.database["gardens"].find_one(query)
+        ) is not None:
+            invalidate_entity(request.app.database, "gardens", garden["_id"])
+            return garden
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Pod with ID {pod_id} not found",
@@ -129,18 +282,35 @@ def update_pod(pod_id: str, request: Request, pod: PodUpdate = Body(...)):
     response_description="Create a new pod",
     status_code=status.HTTP_201_CREATED,
 )
-def create_pod(request: Request, pod: Pod = Body(...)):
+async def create_pod(request: Request, pod: Pod = Body(...)):
     pod = jsonable_encoder(pod)
     garden_id = pod.get("garden_id")
     garden_filter = {"_id": garden_id}
 
-    update_result = request.app.database["gardens"].update_one(
-        garden_filter, {"$push": {"pods": pod}}
-    )
-    if update_result.modified_count == 0:
+    if pods_collection_enabled():
+        if (
+            await find_entity(request.app.database, "gardens", garden_id)
+            is None
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Nothing was added",
+            )
+        await insert_pods(request.app.database, garden_id, [pod])
+        return await find_garden_with_pods(request.app.database, garden_id)
+
+    if (
+        parent_garden := await request.app.database[
+            "gardens"
+        ].find_one_and_update(
+            garden_filter,
+            {"$push": {"pods": pod}},
+            return_document=ReturnDocument.AFTER,
+        )
+    ) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Nothing was added",
         )
-    parent_garden = request.app.database["gardens"].find_one(garden_filter)
+    invalidate_entity(request.app.database, "gardens", garden_id)
     return parent_garden
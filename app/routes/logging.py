@@ -1,14 +1,115 @@
-from datetime import datetime, timedelta
-from typing import List
+from datetime import datetime, timedelta, timezone
+import re
+from typing import List, Optional
 import pytz
 
-from fastapi import APIRouter, Body, HTTPException, Request, status, Query
+from fastapi import (
+    APIRouter,
+    Body,
+    HTTPException,
+    Request,
+    Response,
+    status,
+    Query,
+)
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
-from app.models.logging import Reading, Scheduled_Action, Reactive_Action
+from app.cache import find_entities, find_entity
+from app.columnar import (
+    READINGS_MEDIA_TYPE,
+    accepts_columnar,
+    pack_readings,
+)
+from app.export import (
+    EXPORT_FIELDS,
+    EXPORT_MEDIA_TYPES,
+    accepts_gzip,
+    export_chunks,
+    gzip_chunks,
+)
+from app.latest import (
+    REACTIVE_ACTION,
+    READING,
+    SCHEDULED_ACTION,
+    update_latest,
+)
+from app.listing import projection_for
+from app.models.batch import BatchItemResult, BatchResult
+from app.models.logging import (
+    Reading,
+    ReadingBucket,
+    ReadingRollup,
+    Scheduled_Action,
+    Reactive_Action,
+)
+from app.pagination import after_cursor, encode_cursor
+from app.pubsub import (
+    broker,
+    event_stream,
+    garden_topic,
+    publish_readings,
+    sensor_topic,
+)
+from app.rollups import (
+    ROLLUP_PERIODS,
+    ROLLUP_TABLE_NAME,
+    summarize,
+    update_rollups,
+)
+from app.rules import rules
+from app.storage import (
+    insert_readings,
+    reading_from_document,
+    reading_time,
+    readings_collection,
+)
 
 router = APIRouter()
 ISO8601_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+INTERVAL_PATTERN = re.compile(r"^(\d+)([smhd])$")
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def default_window(start, end, days=1):
+    # Evaluated per request, so a long-lived process does not keep serving
+    # the window it computed when it started.
+    now = datetime.now(pytz.timezone("US/Eastern"))
+    if start is None:
+        start = (now - timedelta(days=days)).strftime(ISO8601_FORMAT)
+    if end is None:
+        end = now.strftime(ISO8601_FORMAT)
+    return start, end
+
+
+def parse_interval(interval):
+    if (match := INTERVAL_PATTERN.match(interval)) is None:
+        raise ValueError(f"Invalid interval {interval}")
+    seconds = int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+    if seconds == 0:
+        raise ValueError(f"Invalid interval {interval}")
+    return seconds
+
+
+async def find_logs(
+    collection, query, model, limit, cursor, response, time_value=None
+):
+    if cursor is not None:
+        try:
+            query = after_cursor(query, cursor, time_value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    logs = (
+        await collection.find(query, projection_for(model))
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(length=None)
+    )
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(logs[-1])
+    return logs
 
 
 @router.post(
@@ -17,60 +118,227 @@ ISO8601_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
     status_code=status.HTTP_201_CREATED,
     response_model=Reading,
 )
-def create_sensor_reading(request: Request, reading: Reading = Body(...)):
+async def create_sensor_reading(
+    request: Request, reading: Reading = Body(...)
+):
     reading = jsonable_encoder(reading)
     sensor_id = reading.get("sensor_id")
     if (
-        request.app.database["sensors"].find_one({"_id": sensor_id})
+        sensor := await find_entity(request.app.database, "sensors", sensor_id)
     ) is not None:
-        new_reading = request.app.database["readings"].insert_one(reading)
-        created_reading = request.app.database["readings"].find_one(
-            {"_id": new_reading.inserted_id}
+        if errors := await insert_readings(request.app.database, [reading]):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail=errors[0]
+            )
+        await update_rollups(request.app.database, [reading])
+        await rules.evaluate_safely(request.app.database, [reading])
+        await update_latest(
+            request.app.database,
+            READING,
+            [reading],
+            {sensor_id: sensor.get("garden_id")},
         )
-        return created_reading
+        publish_readings([reading], {sensor_id: sensor.get("garden_id")})
+        return reading
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Reading with Sensor ID {sensor_id} not found",
     )
 
 
+@router.post(
+    "/sensors/logging/batch",
+    response_description="Create a batch of sensor readings",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BatchResult,
+)
+async def create_sensor_readings(
+    request: Request, response: Response, readings: List[Reading] = Body(...)
+):
+    readings = [jsonable_encoder(reading) for reading in readings]
+    sensor_ids = list({reading.get("sensor_id") for reading in readings})
+    sensors = await find_entities(request.app.database, "sensors", sensor_ids)
+    known_ids = {id: sensor.get("garden_id") for id, sensor in sensors.items()}
+
+    items = []
+    valid = []
+    for index, reading in enumerate(readings):
+        sensor_id = reading.get("sensor_id")
+        if sensor_id in known_ids:
+            valid.append(index)
+            items.append(
+                BatchItemResult(
+                    index=index,
+                    id=reading["_id"],
+                    status=status.HTTP_201_CREATED,
+                )
+            )
+        else:
+            items.append(
+                BatchItemResult(
+                    index=index,
+                    id=reading["_id"],
+                    status=status.HTTP_404_NOT_FOUND,
+                    detail=f"Sensor with ID {sensor_id} not found",
+                )
+            )
+
+    if len(valid) != 0:
+        errors = await insert_readings(
+            request.app.database, [readings[index] for index in valid]
+        )
+        for index, errmsg in errors.items():
+            item = items[valid[index]]
+            item.status = status.HTTP_409_CONFLICT
+            item.detail = errmsg
+        inserted = [
+            readings[index]
+            for index in valid
+            if items[index].status == status.HTTP_201_CREATED
+        ]
+        await update_rollups(request.app.database, inserted)
+        await rules.evaluate_safely(request.app.database, inserted)
+        await update_latest(request.app.database, READING, inserted, known_ids)
+        publish_readings(inserted, known_ids)
+
+    failed_count = sum(
+        1 for item in items if item.status != status.HTTP_201_CREATED
+    )
+    if failed_count != 0:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return BatchResult(
+        inserted_count=len(items) - failed_count,
+        failed_count=failed_count,
+        items=items,
+    )
+
+
+@router.get(
+    "/sensors/logging/stream",
+    response_description="Stream new readings for sensors or gardens",
+    response_class=StreamingResponse,
+)
+async def stream_readings(
+    request: Request,
+    sensor_id: List[str] = Query(default=[]),
+    garden_id: List[str] = Query(default=[]),
+    timeout: float = Query(default=300.0, gt=0, le=3600),
+    heartbeat: float = Query(default=15.0, gt=0),
+):
+    if len(sensor_id) == 0 and len(garden_id) == 0:
+        raise HTTPException(
+            status_code=400, detail="Provide a sensor_id or garden_id"
+        )
+    topics = [sensor_topic(id) for id in sensor_id] + [
+        garden_topic(id) for id in garden_id
+    ]
+
+    async def events():
+        with broker.subscribe(*topics) as queue:
+            async for chunk in event_stream(
+                request, queue, "reading", timeout, heartbeat
+            ):
+                yield chunk
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get(
+    "/sensors/logging/export",
+    response_description="Export readings as NDJSON or CSV",
+    response_class=StreamingResponse,
+)
+async def export_readings(
+    request: Request,
+    format: str = "ndjson",
+    sensor_id: List[str] = Query(default=[]),
+    garden_id: List[str] = Query(default=[]),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    batch_size: int = Query(default=1000, gt=0, le=10000),
+):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    try:
+        for time in [start, end]:
+            if time is not None:
+                datetime.strptime(time, ISO8601_FORMAT)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time format")
+
+    query = {}
+    if len(garden_id) != 0:
+        sensor_id = sensor_id + [
+            sensor["_id"]
+            async for sensor in request.app.database["sensors"].find(
+                {"garden_id": {"$in": garden_id}}, {"_id": 1}
+            )
+        ]
+    if len(sensor_id) != 0 or len(garden_id) != 0:
+        query["sensor_id"] = {"$in": sensor_id}
+    if start is not None or end is not None:
+        query["created_at"] = {}
+        if start is not None:
+            query["created_at"]["$gte"] = reading_time(start, ISO8601_FORMAT)
+        if end is not None:
+            query["created_at"]["$lt"] = reading_time(end, ISO8601_FORMAT)
+
+    cursor = (
+        readings_collection(request.app.database)
+        .find(query, {field: 1 for field in EXPORT_FIELDS})
+        .sort([("created_at", 1), ("_id", 1)])
+        .batch_size(batch_size)
+    )
+    chunks = export_chunks(cursor, format, batch_size)
+    headers = {
+        "Content-Disposition": f'attachment; filename="readings.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        chunks, media_type=EXPORT_MEDIA_TYPES[format], headers=headers
+    )
+
+
 @router.get(
     "/sensors/logging/",
     response_description="List readings for all sensors in the time period",
     response_model=List[Reading],
 )
-def list_readings(
+async def list_readings(
     request: Request,
-    limit: int = 1000,
-    start: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")) - timedelta(days=1)
-        ).strftime(ISO8601_FORMAT)
-    ),
-    end: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")).strftime(ISO8601_FORMAT)
-        )
-    ),
+    response: Response,
+    limit: int = Query(default=1000, gt=0),
+    cursor: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
 ):
+    start, end = default_window(start, end)
     try:
         for time in [start, end]:
             datetime.strptime(time, ISO8601_FORMAT)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format")
 
-    if (
-        len(
-            readings := list(
-                request.app.database["readings"].find(
-                    {"created_at": {"$gte": start, "$lt": end}}
-                )
-            )
-        )
-        != 0
-    ):
-        readings.sort(key=lambda r: r["updated_at"], reverse=True)
-        return readings[:limit]
+    readings = await find_logs(
+        readings_collection(request.app.database),
+        {
+            "created_at": {
+                "$gte": reading_time(start, ISO8601_FORMAT),
+                "$lt": reading_time(end, ISO8601_FORMAT),
+            }
+        },
+        Reading,
+        limit,
+        cursor,
+        response,
+        reading_time,
+    )
+    readings = [reading_from_document(reading) for reading in readings]
+    if len(readings) != 0:
+        return readings
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="No actions were found within the time period",
@@ -81,43 +349,135 @@ def list_readings(
     "/sensors/logging/{sensor_id}",
     response_description="List readings for a sensor in the time period",
     response_model=List[Reading],
+    responses={status.HTTP_200_OK: {"content": {READINGS_MEDIA_TYPE: {}}}},
 )
-def find_readings(
+async def find_readings(
     sensor_id,
     request: Request,
-    limit: int = 1000,
-    start: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")) - timedelta(days=1)
-        ).strftime(ISO8601_FORMAT)
-    ),
-    end: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")).strftime(ISO8601_FORMAT)
+    response: Response,
+    limit: int = Query(default=1000, gt=0),
+    cursor: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    start, end = default_window(start, end)
+    try:
+        for time in [start, end]:
+            datetime.strptime(time, ISO8601_FORMAT)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time format")
+
+    readings = await find_logs(
+        readings_collection(request.app.database),
+        {
+            "sensor_id": sensor_id,
+            "created_at": {
+                "$gte": reading_time(start, ISO8601_FORMAT),
+                "$lt": reading_time(end, ISO8601_FORMAT),
+            },
+        },
+        Reading,
+        limit,
+        cursor,
+        response,
+        reading_time,
+    )
+    readings = [reading_from_document(reading) for reading in readings]
+    # The body depends on Accept, so shared caches must key on it.
+    response.headers["Vary"] = "Accept"
+    if len(readings) != 0 and accepts_columnar(
+        request.headers.get("accept", "")
+    ):
+        columnar = Response(
+            content=pack_readings(readings),
+            media_type=READINGS_MEDIA_TYPE,
+            headers={"Vary": "Accept"},
         )
-    ),
+        if (next_cursor := response.headers.get("X-Next-Cursor")) is not None:
+            columnar.headers["X-Next-Cursor"] = next_cursor
+        return columnar
+    if len(readings) != 0:
+        return readings
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Reading for sensor with ID"
+        + f"{sensor_id} not found or no readings found within the time period",
+    )
+
+
+@router.get(
+    "/sensors/logging/{sensor_id}/series",
+    response_description="Downsample readings for a sensor into buckets",
+    response_model=List[ReadingBucket],
+)
+async def find_reading_series(
+    sensor_id,
+    request: Request,
+    interval: str = "1h",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
 ):
+    start, end = default_window(start, end)
     try:
         for time in [start, end]:
             datetime.strptime(time, ISO8601_FORMAT)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format")
+    try:
+        bucket_ms = parse_interval(interval) * 1000
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid interval")
 
-    if (
-        len(
-            readings := list(
-                request.app.database["readings"].find(
-                    {
+    buckets = (
+        await readings_collection(request.app.database)
+        .aggregate(
+            [
+                {
+                    "$match": {
                         "sensor_id": sensor_id,
-                        "created_at": {"$gte": start, "$lt": end},
+                        "created_at": {
+                            "$gte": reading_time(start, ISO8601_FORMAT),
+                            "$lt": reading_time(end, ISO8601_FORMAT),
+                        },
                     }
-                )
-            )
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "value": 1,
+                        "ts": {"$toLong": {"$toDate": "$created_at"}},
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": {
+                            "$subtract": [
+                                "$ts",
+                                {"$mod": ["$ts", bucket_ms]},
+                            ]
+                        },
+                        "min": {"$min": "$value"},
+                        "max": {"$max": "$value"},
+                        "mean": {"$avg": "$value"},
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$sort": {"_id": 1}},
+            ]
         )
-        != 0
-    ):
-        readings.sort(key=lambda r: r["updated_at"], reverse=True)
-        return readings[:limit]
+        .to_list(length=None)
+    )
+    if len(buckets) != 0:
+        return [
+            {
+                **bucket,
+                "start": datetime.fromtimestamp(
+                    bucket["_id"] / 1000, tz=timezone.utc
+                ),
+            }
+            for bucket in buckets
+        ]
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -126,29 +486,76 @@ def find_readings(
     )
 
 
+@router.get(
+    "/sensors/logging/{sensor_id}/rollups",
+    response_description="List hourly or daily rollups for a sensor",
+    response_model=List[ReadingRollup],
+)
+async def find_reading_rollups(
+    sensor_id,
+    request: Request,
+    period: str = "hour",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    start, end = default_window(start, end, days=30)
+    try:
+        start_time, end_time = [
+            datetime.strptime(time, ISO8601_FORMAT) for time in [start, end]
+        ]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time format")
+    if period not in ROLLUP_PERIODS:
+        raise HTTPException(status_code=400, detail="Invalid period")
+
+    rollups = (
+        await request.app.database[ROLLUP_TABLE_NAME]
+        .find(
+            {
+                "sensor_id": sensor_id,
+                "period": period,
+                "start": {"$gte": start_time, "$lt": end_time},
+            }
+        )
+        .sort("start", 1)
+        .to_list(length=None)
+    )
+    if len(rollups) != 0:
+        return [summarize(rollup) for rollup in rollups]
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Rollups for sensor with ID"
+        + f"{sensor_id} not found or no rollups found within the time period",
+    )
+
+
 @router.post(
     "/sa/logging/actions/",
     response_description="Create a new scheduled action log",
     status_code=status.HTTP_201_CREATED,
     response_model=Scheduled_Action,
 )
-def create_scheduled_action(
+async def create_scheduled_action(
     request: Request, scheduled_action: Scheduled_Action = Body(...)
 ):
     scheduled_action = jsonable_encoder(scheduled_action)
     actuator_id = scheduled_action.get("actuator_id")
     if (
-        request.app.database["scheduled_actuators"].find_one(
-            {"_id": actuator_id}
+        actuator := await find_entity(
+            request.app.database, "scheduled_actuators", actuator_id
         )
     ) is not None:
-        new_scheduled_action = request.app.database[
-            "scheduled_actions"
-        ].insert_one(scheduled_action)
-        created_scheduled_action = request.app.database[
-            "scheduled_actions"
-        ].find_one({"_id": new_scheduled_action.inserted_id})
-        return created_scheduled_action
+        await request.app.database["scheduled_actions"].insert_one(
+            scheduled_action
+        )
+        await update_latest(
+            request.app.database,
+            SCHEDULED_ACTION,
+            [scheduled_action],
+            {actuator_id: actuator.get("garden_id")},
+        )
+        return scheduled_action
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="Scheduled action for actuator with ID"
@@ -161,38 +568,31 @@ def create_scheduled_action(
     response_description="List all scheduled action logs in the time period",
     response_model=List[Scheduled_Action],
 )
-def list_scheduled_actions(
+async def list_scheduled_actions(
     request: Request,
-    limit: int = 1000,
-    start: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")) - timedelta(days=1)
-        ).strftime(ISO8601_FORMAT)
-    ),
-    end: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")).strftime(ISO8601_FORMAT)
-        )
-    ),
+    response: Response,
+    limit: int = Query(default=1000, gt=0),
+    cursor: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
 ):
+    start, end = default_window(start, end)
     try:
         for time in [start, end]:
             datetime.strptime(time, ISO8601_FORMAT)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format")
 
-    if (
-        len(
-            scheduled_actions := list(
-                request.app.database["scheduled_actions"].find(
-                    {"created_at": {"$gte": start, "$lt": end}}
-                )
-            )
-        )
-        != 0
-    ):
-        scheduled_actions.sort(key=lambda r: r["updated_at"], reverse=True)
-        return scheduled_actions[:limit]
+    scheduled_actions = await find_logs(
+        request.app.database["scheduled_actions"],
+        {"created_at": {"$gte": start, "$lt": end}},
+        Scheduled_Action,
+        limit,
+        cursor,
+        response,
+    )
+    if len(scheduled_actions) != 0:
+        return scheduled_actions
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="No actions were found within the time period",
@@ -205,42 +605,35 @@ def list_scheduled_actions(
     + "specific actuator in the time period",
     response_model=List[Scheduled_Action],
 )
-def find_scheduled_actions(
+async def find_scheduled_actions(
     actuator_id,
     request: Request,
-    limit: int = 1000,
-    start: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")) - timedelta(days=1)
-        ).strftime(ISO8601_FORMAT)
-    ),
-    end: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")).strftime(ISO8601_FORMAT)
-        )
-    ),
+    response: Response,
+    limit: int = Query(default=1000, gt=0),
+    cursor: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
 ):
+    start, end = default_window(start, end)
     try:
         for time in [start, end]:
             datetime.strptime(time, ISO8601_FORMAT)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format")
 
-    if (
-        len(
-            scheduled_actions := list(
-                request.app.database["scheduled_actions"].find(
-                    {
-                        "actuator_id": actuator_id,
-                        "created_at": {"$gte": start, "$lt": end},
-                    }
-                )
-            )
-        )
-        != 0
-    ):
-        scheduled_actions.sort(key=lambda r: r["updated_at"], reverse=True)
-        return scheduled_actions[:limit]
+    scheduled_actions = await find_logs(
+        request.app.database["scheduled_actions"],
+        {
+            "actuator_id": actuator_id,
+            "created_at": {"$gte": start, "$lt": end},
+        },
+        Scheduled_Action,
+        limit,
+        cursor,
+        response,
+    )
+    if len(scheduled_actions) != 0:
+        return scheduled_actions
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -255,23 +648,30 @@ def find_scheduled_actions(
     status_code=status.HTTP_201_CREATED,
     response_model=Reactive_Action,
 )
-def create_reactive_action(
+async def create_reactive_action(
     request: Request, reactive_action: Reactive_Action = Body(...)
 ):
     reactive_action = jsonable_encoder(reactive_action)
     actuator_id = reactive_action.get("actuator_id")
     if (
-        request.app.database["reactive_actuators"].find_one(
-            {"_id": actuator_id}
+        actuator := await find_entity(
+            request.app.database, "reactive_actuators", actuator_id
         )
     ) is not None:
-        new_reactive_action = request.app.database[
-            "reactive_actions"
-        ].insert_one(reactive_action)
-        created_reactive_action = request.app.database[
-            "reactive_actions"
-        ].find_one({"_id": new_reactive_action.inserted_id})
-        return created_reactive_action
+        await request.app.database["reactive_actions"].insert_one(
+            reactive_action
+        )
+        # Reactive actuators belong to a garden through their sensor.
+        sensor = await find_entity(
+            request.app.database, "sensors", actuator.get("sensor_id")
+        )
+        await update_latest(
+            request.app.database,
+            REACTIVE_ACTION,
+            [reactive_action],
+            {actuator_id: None if sensor is None else sensor.get("garden_id")},
+        )
+        return reactive_action
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Reactive action for actuator with ID {actuator_id} not found",
@@ -283,38 +683,31 @@ def create_reactive_action(
     response_description="List all reactive action logs in the time period",
     response_model=List[Reactive_Action],
 )
-def list_reactive_actions(
+async def list_reactive_actions(
     request: Request,
-    limit: int = 1000,
-    start: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")) - timedelta(days=1)
-        ).strftime(ISO8601_FORMAT)
-    ),
-    end: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")).strftime(ISO8601_FORMAT)
-        )
-    ),
+    response: Response,
+    limit: int = Query(default=1000, gt=0),
+    cursor: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
 ):
+    start, end = default_window(start, end)
     try:
         for time in [start, end]:
             datetime.strptime(time, ISO8601_FORMAT)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format")
 
-    if (
-        len(
-            reactive_actions := list(
-                request.app.database["reactive_actions"].find(
-                    {"created_at": {"$gte": start, "$lt": end}}
-                )
-            )
-        )
-        != 0
-    ):
-        reactive_actions.sort(key=lambda r: r["updated_at"], reverse=True)
-        return reactive_actions[:limit]
+    reactive_actions = await find_logs(
+        request.app.database["reactive_actions"],
+        {"created_at": {"$gte": start, "$lt": end}},
+        Reactive_Action,
+        limit,
+        cursor,
+        response,
+    )
+    if len(reactive_actions) != 0:
+        return reactive_actions
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="No actions were found within the time period",
@@ -327,42 +720,35 @@ def list_reactive_actions(
     + "specific actuator in the time period",
     response_model=List[Reactive_Action],
 )
-def find_reactive_actions(
+async def find_reactive_actions(
     actuator_id,
     request: Request,
-    limit: int = 1000,
-    start: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")) - timedelta(days=1)
-        ).strftime(ISO8601_FORMAT)
-    ),
-    end: str = Query(
-        default=(
-            datetime.now(pytz.timezone("US/Eastern")).strftime(ISO8601_FORMAT)
-        )
-    ),
+    response: Response,
+    limit: int = Query(default=1000, gt=0),
+    cursor: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
 ):
+    start, end = default_window(start, end)
     try:
         for time in [start, end]:
             datetime.strptime(time, ISO8601_FORMAT)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format")
 
-    if (
-        len(
-            reactive_actions := list(
-                request.app.database["reactive_actions"].find(
-                    {
-                        "actuator_id": actuator_id,
-                        "created_at": {"$gte": start, "$lt": end},
-                    }
-                )
-            )
-        )
-        != 0
-    ):
-        reactive_actions.sort(key=lambda r: r["updated_at"], reverse=True)
-        return reactive_actions[:limit]
+    reactive_actions = await find_logs(
+        request.app.database["reactive_actions"],
+        {
+            "actuator_id": actuator_id,
+            "created_at": {"$gte": start, "$lt": end},
+        },
+        Reactive_Action,
+        limit,
+        cursor,
+        response,
+    )
+    if len(reactive_actions) != 0:
+        return reactive_actions
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
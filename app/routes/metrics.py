@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import metrics
+
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    response_description="Get request and database metrics",
+    response_class=PlainTextResponse,
+)
+async def find_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -1,9 +1,14 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Body, HTTPException, Request, status
+from fastapi import APIRouter, Body, HTTPException, Query, Request, status
 from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
 
+from app.cache import invalidate_entity
+from app.listing import list_documents
 from app.models.reactive_actuator import Reactive_Actuator, RA_Update
+from app.rules import rules
+from app.scheduler import scheduler
 
 router = APIRouter()
 
@@ -14,16 +19,15 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     response_model=Reactive_Actuator,
 )
-def create_reactive_actuator(
+async def create_reactive_actuator(
     request: Request, reactive_actuator: Reactive_Actuator = Body(...)
 ):
     ra = jsonable_encoder(reactive_actuator)
-    new_ra = request.app.database["reactive_actuators"].insert_one(ra)
-    created_ra = request.app.database["reactive_actuators"].find_one(
-        {"_id": new_ra.inserted_id}
-    )
+    await request.app.database["reactive_actuators"].insert_one(ra)
+    scheduler.invalidate()
+    rules.invalidate()
 
-    return created_ra
+    return ra
 
 
 @router.get(
@@ -31,13 +35,32 @@ def create_reactive_actuator(
     response_description="List reactive actuators",
     response_model=List[Reactive_Actuator],
 )
-def list_reactive_actuators(request: Request, limit: int = 1000):
-    reactive_actuators = list(
-        request.app.database["reactive_actuators"].find()
+async def list_reactive_actuators(
+    request: Request,
+    limit: int = Query(default=1000, gt=0),
+    sensor_id: Optional[str] = None,
+    garden_id: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    sensor_ids = [] if sensor_id is None else [sensor_id]
+    # Reactive actuators belong to a garden through their sensor.
+    if garden_id is not None:
+        sensor_ids += [
+            sensor["_id"]
+            async for sensor in request.app.database["sensors"].find(
+                {"garden_id": garden_id}, {"_id": 1}
+            )
+        ]
+    query = {}
+    if sensor_id is not None or garden_id is not None:
+        query["sensor_id"] = {"$in": sensor_ids}
+    return await list_documents(
+        request.app.database["reactive_actuators"],
+        query,
+        Reactive_Actuator,
+        limit,
+        fields,
     )
-    reactive_actuators.sort(key=lambda r: r["updated_at"], reverse=True)
-
-    return reactive_actuators[:limit]
 
 
 @router.get(
@@ -45,9 +68,11 @@ def list_reactive_actuators(request: Request, limit: int = 1000):
     response_description="Get a single reactive actuator by id",
     response_model=Reactive_Actuator,
 )
-def find_reactive_actuator(id: str, request: Request):
+async def find_reactive_actuator(id: str, request: Request):
     if (
-        ra := request.app.database["reactive_actuators"].find_one({"_id": id})
+        ra := await request.app.database["reactive_actuators"].find_one(
+            {"_id": id}
+        )
     ) is not None:
         return ra
 
@@ -58,30 +83,28 @@ def find_reactive_actuator(id: str, request: Request):
 
 
 @router.put("/{id}", response_description="Update a reactive actuator")
-def update_reactive_actuator(
+async def update_reactive_actuator(
     id: str, request: Request, ra: RA_Update = Body(...)
 ):
     ra = {k: v for k, v in ra.dict().items() if v is not None}
 
     if len(ra) >= 1:
-        update_result = request.app.database["reactive_actuators"].update_one(
-            {"_id": id}, {"$set": ra}
+        updated_ra = await request.app.database[
+            "reactive_actuators"
+        ].find_one_and_update(
+            {"_id": id},
+            {"$set": ra},
+            return_document=ReturnDocument.AFTER,
         )
-
-        if update_result.modified_count == 1:
-            if (
-                updated_ra := request.app.database[
-                    "reactive_actuators"
-                ].find_one({"_id": id})
-            ) is not None:
-                return updated_ra
-
-    if (
-        existing_reactive_actuator := request.app.database[
-            "reactive actuators"
-        ].find_one({"_id": id})
-    ) is not None:
-        return existing_reactive_actuator
+        invalidate_entity(request.app.database, "reactive_actuators", id)
+        scheduler.invalidate()
+        rules.invalidate()
+    else:
+        updated_ra = await request.app.database["reactive_actuators"].find_one(
+            {"_id": id}
+        )
+    if updated_ra is not None:
+        return updated_ra
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
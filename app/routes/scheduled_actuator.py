@@ -1,8 +1,11 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Body, HTTPException, Request, status
+from fastapi import APIRouter, Body, HTTPException, Query, Request, status
 from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
 
+from app.cache import invalidate_entity
+from app.listing import list_documents
 from app.models.scheduled_actuator import Scheduled_Actuator, SA_Update
 
 router = APIRouter()
@@ -14,16 +17,13 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     response_model=Scheduled_Actuator,
 )
-def create_scheduled_actuator(
+async def create_scheduled_actuator(
     request: Request, scheduled_actuator: Scheduled_Actuator = Body(...)
 ):
     sa = jsonable_encoder(scheduled_actuator)
-    new_sa = request.app.database["scheduled_actuators"].insert_one(sa)
-    created_sa = request.app.database["scheduled_actuators"].find_one(
-        {"_id": new_sa.inserted_id}
-    )
+    await request.app.database["scheduled_actuators"].insert_one(sa)
 
-    return created_sa
+    return sa
 
 
 @router.get(
@@ -31,13 +31,20 @@ def create_scheduled_actuator(
     response_description="List scheduled actuators",
     response_model=List[Scheduled_Actuator],
 )
-def list_scheduled_actuators(request: Request, limit: int = 1000):
-    scheduled_actuators = list(
-        request.app.database["scheduled_actuators"].find()
+async def list_scheduled_actuators(
+    request: Request,
+    limit: int = Query(default=1000, gt=0),
+    garden_id: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    query = {} if garden_id is None else {"garden_id": garden_id}
+    return await list_documents(
+        request.app.database["scheduled_actuators"],
+        query,
+        Scheduled_Actuator,
+        limit,
+        fields,
     )
-    scheduled_actuators.sort(key=lambda r: r["updated_at"], reverse=True)
-
-    return scheduled_actuators[:limit]
 
 
 @router.get(
@@ -45,9 +52,11 @@ def list_scheduled_actuators(request: Request, limit: int = 1000):
     response_description="Get a single scheduled actuator by id",
     response_model=Scheduled_Actuator,
 )
-def find_scheduled_actuator(id: str, request: Request):
+async def find_scheduled_actuator(id: str, request: Request):
     if (
-        sa := request.app.database["scheduled_actuators"].find_one({"_id": id})
+        sa := await request.app.database["scheduled_actuators"].find_one(
+            {"_id": id}
+        )
     ) is not None:
         return sa
 
@@ -58,27 +67,26 @@ def find_scheduled_actuator(id: str, request: Request):
 
 
 @router.put("/{id}", response_description="Update a scheduled actuator")
-def update_scheduled_actuator(
+async def update_scheduled_actuator(
     id: str, request: Request, sa: SA_Update = Body(...)
 ):
     sa = {k: v for k, v in sa.dict().items() if v is not None}
 
     if len(sa) >= 1:
-        update_result = request.app.database["scheduled_actuators"].update_one(
-            {"_id": id}, {"$set": sa}
+        updated_sa = await request.app.database[
+            "scheduled_actuators"
+        ].find_one_and_update(
+            {"_id": id},
+            {"$set": sa},
+            return_document=ReturnDocument.AFTER,
         )
-
-        if update_result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Scheduled Actuator with ID {id} not found",
-            )
-    if (
-        existing_scheduled_actuator := request.app.database[
+        invalidate_entity(request.app.database, "scheduled_actuators", id)
+    else:
+        updated_sa = await request.app.database[
             "scheduled_actuators"
         ].find_one({"_id": id})
-    ) is not None:
-        return existing_scheduled_actuator
+    if updated_sa is not None:
+        return updated_sa
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,28 @@
+from typing import List
+
+from fastapi import APIRouter, Request
+
+from app.models.command import Command
+from app.models.scheduler import SchedulerStatus
+from app.scheduler import scheduler
+
+
+router = APIRouter()
+
+
+@router.post(
+    "/tick",
+    response_description="Queue the commands that are due",
+    response_model=List[Command],
+)
+async def tick_scheduler(request: Request):
+    return await scheduler.tick(request.app.database)
+
+
+@router.get(
+    "/",
+    response_description="Get the scheduler status",
+    response_model=SchedulerStatus,
+)
+async def find_scheduler_status():
+    return scheduler.status()
@@ -1,8 +1,19 @@
-from typing import List
-
-from fastapi import APIRouter, Body, HTTPException, Request, Response, status
+from typing import List, Optional
+
+from fastapi import (
+    APIRouter,
+    Body,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
 
+from app.cache import find_entity, invalidate_entity
+from app.listing import list_documents
 from app.models.sensor import Sensor, SensorUpdate
 
 router = APIRouter()
@@ -14,17 +25,14 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     response_model=Sensor,
 )
-def create_sensor(request: Request, sensor: Sensor = Body(...)):
+async def create_sensor(request: Request, sensor: Sensor = Body(...)):
     sensor = jsonable_encoder(sensor)
     garden_id = sensor.get("garden_id")
     if (
-        request.app.database["gardens"].find_one({"_id": garden_id})
+        await find_entity(request.app.database, "gardens", garden_id)
     ) is not None:
-        new_sensor = request.app.database["sensors"].insert_one(sensor)
-        created_sensor = request.app.database["sensors"].find_one(
-            {"_id": new_sensor.inserted_id}
-        )
-        return created_sensor
+        await request.app.database["sensors"].insert_one(sensor)
+        return sensor
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Sensor with garden ID {garden_id} not found",
@@ -34,10 +42,16 @@ def create_sensor(request: Request, sensor: Sensor = Body(...)):
 @router.get(
     "/", response_description="List sensors", response_model=List[Sensor]
 )
-def list_sensors(request: Request, limit: int = 1000):
-    sensors = list(request.app.database["sensors"].find())
-    sensors.sort(key=lambda r: r["updated_at"], reverse=True)
-    return sensors[:limit]
+async def list_sensors(
+    request: Request,
+    limit: int = Query(default=1000, gt=0),
+    garden_id: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    query = {} if garden_id is None else {"garden_id": garden_id}
+    return await list_documents(
+        request.app.database["sensors"], query, Sensor, limit, fields
+    )
 
 
 @router.get(
@@ -45,9 +59,9 @@ def list_sensors(request: Request, limit: int = 1000):
     response_description="Get a single sensor by id",
     response_model=Sensor,
 )
-def find_sensor(id: str, request: Request):
+async def find_sensor(id: str, request: Request):
     if (
-        sensor := request.app.database["sensors"].find_one({"_id": id})
+        sensor := await request.app.database["sensors"].find_one({"_id": id})
     ) is not None:
         return sensor
 
@@ -60,26 +74,26 @@ def find_sensor(id: str, request: Request):
 @router.put(
     "/{id}", response_description="Update a sensor", response_model=Sensor
 )
-def update_sensor(id: str, request: Request, sensor: SensorUpdate = Body(...)):
+async def update_sensor(
+    id: str, request: Request, sensor: SensorUpdate = Body(...)
+):
     sensor = {k: v for k, v in sensor.dict().items() if v is not None}
 
     if len(sensor) >= 1:
-        update_result = request.app.database["sensors"].update_one(
-            {"_id": id}, {"$set": sensor}
+        updated_sensor = await request.app.database[
+            "sensors"
+        ].find_one_and_update(
+            {"_id": id},
+            {"$set": sensor},
+            return_document=ReturnDocument.AFTER,
         )
-
-        if update_result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Sensor with ID {id} not found",
-            )
-
-    if (
-        existing_sensor := request.app.database["sensors"].find_one(
+        invalidate_entity(request.app.database, "sensors", id)
+    else:
+        updated_sensor = await request.app.database["sensors"].find_one(
             {"_id": id}
         )
-    ) is not None:
-        return existing_sensor
+    if updated_sensor is not None:
+        return updated_sensor
 
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -88,8 +102,11 @@ def update_sensor(id: str, request: Request, sensor: SensorUpdate = Body(...)):
 
 
 @router.delete("/{id}", response_description="Delete a sensor")
-def delete_sensor(id: str, request: Request, response: Response):
-    delete_result = request.app.database["sensors"].delete_one({"_id": id})
+async def delete_sensor(id: str, request: Request, response: Response):
+    delete_result = await request.app.database["sensors"].delete_one(
+        {"_id": id}
+    )
+    invalidate_entity(request.app.database, "sensors", id)
 
     if delete_result.deleted_count == 1:
         response.status_code = status.HTTP_204_NO_CONTENT
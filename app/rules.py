@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict
+
+from app.database import insert_unordered
+from app.pubsub import publish_commands
+from app.scheduler import command_for, garden_configs
+from app.times import from_timestamp
+
+
+logger = logging.getLogger(__name__)
+
+REACTIVE_ACTUATOR = "reactive actuator"
+CEILING = 1
+FLOOR = 0
+
+
+class Rule:
+    def __init__(self, garden_id, schedule):
+        self.key = (garden_id, REACTIVE_ACTUATOR, schedule["ra_id"])
+        self.threshold = schedule["threshold"]
+        self.threshold_type = schedule["threshold_type"]
+        self.duration = schedule["duration"]
+        self.interval = schedule["interval"]
+
+    def triggered(self, value):
+        if self.threshold_type == CEILING:
+            return value > self.threshold
+        if self.threshold_type == FLOOR:
+            return value < self.threshold
+        return False
+
+    def cooling_down(self, last_fired, now):
+        return last_fired is not None and now - last_fired < self.interval
+
+
+# Commands take their ids from the reading that triggered them, so a
+# retried ingest of the same reading collides on _id instead of running
+# the actuator twice.
+def rule_command_id(key, reading_id, cmd):
+    garden_id, type, ref_id = key
+    return str(
+        uuid.uuid5(
+            uuid.NAMESPACE_URL,
+            f"{garden_id}:{type}:{ref_id}:{cmd}:reading:{reading_id}",
+        )
+    )
+
+
+class RuleEngine:
+    def __init__(self, reload_seconds=60.0):
+        self.reload_seconds = reload_seconds
+        self._rules = {}
+        self._fired = {}
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    async def load(self, database):
+        gardens, ra_sensors = await garden_configs(database)
+        rules = defaultdict(list)
+        for garden_id, config in gardens:
+            for schedule in config.get("ra_schedule") or []:
+                try:
+                    if (
+                        sensor_id := ra_sensors.get(schedule["ra_id"])
+                    ) is None:
+                        continue
+                    rules[sensor_id].append(Rule(garden_id, schedule))
+                except (AttributeError, KeyError, TypeError):
+                    logger.exception(
+                        "Skipping malformed ra_schedule entry in config %s",
+                        config.get("_id"),
+                    )
+        self._rules = dict(rules)
+        self._loaded_at = time.monotonic()
+
+    async def rules_for(self, database, sensor_id):
+        async with self._lock:
+            if (
+                self._loaded_at is None
+                or time.monotonic() - self._loaded_at >= self.reload_seconds
+            ):
+                await self.load(database)
+        return self._rules.get(sensor_id, ())
+
+    async def evaluate(self, database, readings, now=None):
+        now = time.time() if now is None else now
+        fired = {}
+        commands = []
+        deferred = []
+        for reading in readings:
+            for rule in await self.rules_for(database, reading["sensor_id"]):
+                if not rule.triggered(reading["value"]):
+                    continue
+                # A rule fires at most once per interval, counted from its
+                # last fire, so a burst of readings past the threshold runs
+                # the actuator once.
+                if rule.cooling_down(
+                    fired.get(rule.key, self._fired.get(rule.key)), now
+                ):
+                    continue
+                fired[rule.key] = now
+                commands.append(
+                    command_for(
+                        rule.key,
+                        now,
+                        1,
+                        id=rule_command_id(rule.key, reading["_id"], 1),
+                    )
+                )
+                deferred.append(
+                    command_for(
+                        rule.key,
+                        now + rule.duration,
+                        0,
+                        leased_until=from_timestamp(now + rule.duration),
+                        id=rule_command_id(rule.key, reading["_id"], 0),
+                    )
+                )
+
+        if len(commands) == 0:
+            return commands
+        commands += deferred
+        errors = await insert_unordered(database["commands"], commands)
+        inserted = [
+            command
+            for index, command in enumerate(commands)
+            if index not in errors
+        ]
+        # Only a written on command starts the rule's cooldown, so a failed
+        # insert is retried by the next reading.
+        for index, key in enumerate(fired):
+            if index not in errors:
+                self._fired[key] = fired[key]
+        # Off commands are stored right away but only become claimable
+        # once their lease runs out, so live feeds hear about them then.
+        loop = asyncio.get_running_loop()
+        for command in inserted:
+            if (leased_until := command["leased_until"]) is None:
+                publish_commands([command])
+            else:
+                loop.call_later(
+                    max(leased_until.timestamp() - now, 0),
+                    publish_commands,
+                    [command],
+                )
+        return inserted
+
+    # Ingest calls this after the readings are written, so a failing rule
+    # is logged instead of failing a request whose data is already stored.
+    async def evaluate_safely(self, database, readings):
+        try:
+            return await self.evaluate(database, readings)
+        except Exception:
+            logger.exception("Reactive actuator rules failed")
+            return []
+
+
+rules = RuleEngine(
+    reload_seconds=float(os.environ.get("RULES_RELOAD_SECONDS", 60))
+)
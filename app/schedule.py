@@ -0,0 +1,138 @@
+import bisect
+import heapq
+import os
+
+from app.cache import TTLCache
+from app.times import from_timestamp, timestamp
+
+
+DAY = 86400
+
+
+# Each SA on/off list holds times of day; the dates are ignored and the
+# schedule repeats every UTC day.
+class DailySchedule:
+    def __init__(self, on, off):
+        events = sorted(
+            [(timestamp(at) % DAY, True) for at in on]
+            + [(timestamp(at) % DAY, False) for at in off]
+        )
+        deduped = []
+        for seconds, state in events:
+            if len(deduped) == 0 or deduped[-1][1] != state:
+                deduped.append((seconds, state))
+        if len(deduped) > 1 and deduped[0][1] == deduped[-1][1]:
+            deduped.pop(0)
+        self.times = [seconds for seconds, _ in deduped]
+        self.states = [state for _, state in deduped]
+
+    def state_at(self, at):
+        if len(self.times) == 0:
+            return False, None, None
+        if len(self.times) == 1:
+            return self.states[0], None, None
+        day, seconds = divmod(timestamp(at), DAY)
+        start = day * DAY
+        index = bisect.bisect_right(self.times, seconds)
+        if index == 0:
+            since = start - DAY + self.times[-1]
+        else:
+            since = start + self.times[index - 1]
+        if index == len(self.times):
+            until = start + DAY + self.times[0]
+        else:
+            until = start + self.times[index]
+        return (
+            self.states[index - 1],
+            from_timestamp(since),
+            from_timestamp(until),
+        )
+
+    def transitions(self, start, end):
+        if len(self.times) < 2:
+            return
+        day, seconds = divmod(timestamp(start), DAY)
+        end = timestamp(end)
+        index = bisect.bisect_left(self.times, seconds)
+        while True:
+            if index == len(self.times):
+                day, index = day + 1, 0
+            if (at := day * DAY + self.times[index]) >= end:
+                return
+            yield at, self.states[index]
+            index += 1
+
+
+def tagged_transitions(sa_id, schedule, start, end):
+    for at, on in schedule.transitions(start, end):
+        yield at, sa_id, on
+
+
+class CompiledSchedule:
+    def __init__(self, config):
+        self.actuators = {
+            schedule["sa_id"]: DailySchedule(schedule["on"], schedule["off"])
+            for schedule in config.get("sa_schedule") or []
+        }
+
+    def state(self, at):
+        states = []
+        for sa_id, schedule in self.actuators.items():
+            on, since, until = schedule.state_at(at)
+            states.append(
+                {"sa_id": sa_id, "on": on, "since": since, "until": until}
+            )
+        return states
+
+    def transitions(self, start, end, limit):
+        merged = heapq.merge(
+            *(
+                tagged_transitions(sa_id, schedule, start, end)
+                for sa_id, schedule in self.actuators.items()
+            )
+        )
+        transitions = []
+        for at, sa_id, on in merged:
+            if len(transitions) == limit:
+                break
+            transitions.append(
+                {"sa_id": sa_id, "at": from_timestamp(at), "on": on}
+            )
+        return transitions
+
+
+compiled = TTLCache(
+    maxsize=int(os.environ.get("SCHEDULE_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("SCHEDULE_CACHE_TTL", 300)),
+)
+
+
+def schedule_key(database, id):
+    return (database.name, id)
+
+
+async def compiled_schedule(database, id):
+    if (
+        version := await database["configs"].find_one(
+            {"_id": id}, {"updated_at": 1}
+        )
+    ) is None:
+        return None
+    key = schedule_key(database, id)
+    if (entry := compiled.get(key)) is not None and entry[0] == str(
+        version.get("updated_at")
+    ):
+        return entry[1]
+    if (
+        config := await database["configs"].find_one(
+            {"_id": id}, {"updated_at": 1, "sa_schedule": 1}
+        )
+    ) is None:
+        return None
+    schedule = CompiledSchedule(config)
+    compiled.set(key, (str(config.get("updated_at")), schedule))
+    return schedule
+
+
+def invalidate_schedule(database, id):
+    compiled.invalidate(schedule_key(database, id))
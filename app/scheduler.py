@@ -0,0 +1,240 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+import uuid
+
+import pytz
+from fastapi.encoders import jsonable_encoder
+
+from app.database import insert_unordered
+from app.models.command import Command
+from app.pubsub import publish_commands
+from app.schedule import DailySchedule
+from app.times import from_timestamp, timestamp
+
+
+logger = logging.getLogger(__name__)
+
+SENSOR = "sensor"
+SCHEDULED_ACTUATOR = "scheduled actuator"
+
+
+class IntervalJob:
+    def __init__(self, garden_id, ref_id, type, interval):
+        self.key = (garden_id, type, ref_id)
+        self.interval = interval
+
+    def next_fire(self, after):
+        return (math.floor(after / self.interval) + 1) * self.interval
+
+    def due(self, now):
+        return math.floor(now / self.interval) * self.interval, 1
+
+
+class ActuatorJob:
+    def __init__(self, garden_id, ref_id, schedule):
+        self.key = (garden_id, SCHEDULED_ACTUATOR, ref_id)
+        self.schedule = schedule
+
+    def next_fire(self, after):
+        _, _, until = self.schedule.state_at(from_timestamp(after))
+        return None if until is None else timestamp(until)
+
+    def due(self, now):
+        on, since, _ = self.schedule.state_at(from_timestamp(now))
+        return timestamp(since), int(on)
+
+
+def config_jobs(garden_id, config, ra_sensors):
+    for schedule in config.get("sensor_schedule") or []:
+        if schedule["interval"] > 0:
+            yield IntervalJob(
+                garden_id, schedule["sensor_id"], SENSOR, schedule["interval"]
+            )
+    # Reactive actuators act on readings, so their schedule polls the
+    # sensor they watch and the rules run when the reading comes in.
+    for schedule in config.get("ra_schedule") or []:
+        if (
+            sensor_id := ra_sensors.get(schedule["ra_id"])
+        ) is not None and schedule["interval"] > 0:
+            yield IntervalJob(
+                garden_id, sensor_id, SENSOR, schedule["interval"]
+            )
+    for schedule in config.get("sa_schedule") or []:
+        yield ActuatorJob(
+            garden_id,
+            schedule["sa_id"],
+            DailySchedule(schedule["on"], schedule["off"]),
+        )
+
+
+async def garden_configs(database):
+    gardens = await (
+        database["gardens"]
+        .find({"config_id": {"$ne": None}}, {"config_id": 1})
+        .to_list(length=None)
+    )
+    configs = {
+        config["_id"]: config
+        async for config in database["configs"].find(
+            {"_id": {"$in": [garden["config_id"] for garden in gardens]}}
+        )
+    }
+    # Malformed entries are left for config_jobs to reject per config, so
+    # one bad document cannot fail the load for every garden.
+    ra_ids = [
+        schedule.get("ra_id")
+        for config in configs.values()
+        if isinstance(config.get("ra_schedule"), list)
+        for schedule in config["ra_schedule"]
+        if isinstance(schedule, dict)
+    ]
+    ra_sensors = {
+        actuator["_id"]: actuator["sensor_id"]
+        async for actuator in database["reactive_actuators"].find(
+            {"_id": {"$in": ra_ids}}, {"sensor_id": 1}
+        )
+    }
+    return [
+        (garden["_id"], configs[garden["config_id"]])
+        for garden in gardens
+        if garden["config_id"] in configs
+    ], ra_sensors
+
+
+def command_for(key, fired_at, cmd, leased_until=None, id=None):
+    garden_id, type, ref_id = key
+    created_at = from_timestamp(fired_at).astimezone(
+        pytz.timezone("US/Eastern")
+    )
+    # Ids derive from the job and fire time, so a tick repeated by another
+    # process collides on _id instead of queueing the command twice.
+    if id is None:
+        id = uuid.uuid5(
+            uuid.NAMESPACE_URL,
+            f"{garden_id}:{type}:{ref_id}:{cmd}:{fired_at}",
+        )
+    command = jsonable_encoder(
+        Command(
+            id=str(id),
+            ref_id=ref_id,
+            cmd=cmd,
+            type=type,
+            garden_id=garden_id,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+    )
+    # Stored as a date, like a claim's lease, so the command stays hidden
+    # from claims and feeds until then.
+    command["leased_until"] = leased_until
+    return command
+
+
+class Scheduler:
+    def __init__(self, reload_seconds=60.0):
+        self.reload_seconds = reload_seconds
+        self._jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._loaded_at = None
+        self._last_tick = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _push(self, job, after):
+        if (at := job.next_fire(after)) is not None:
+            heapq.heappush(self._heap, (at, next(self._counter), job))
+
+    async def load(self, database, now):
+        gardens, ra_sensors = await garden_configs(database)
+        jobs = {}
+        for garden_id, config in gardens:
+            try:
+                garden_jobs = list(config_jobs(garden_id, config, ra_sensors))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                logger.exception(
+                    "Skipping malformed config %s", config.get("_id")
+                )
+                continue
+            for job in garden_jobs:
+                # A sensor polled by both its own schedule and a reactive
+                # actuator's keeps the shorter interval.
+                if isinstance(
+                    existing := jobs.get(job.key), IntervalJob
+                ) and isinstance(job, IntervalJob):
+                    existing.interval = min(existing.interval, job.interval)
+                else:
+                    jobs[job.key] = job
+
+        # Jobs resume from the last tick so a reload neither drops nor
+        # repeats anything that fell due in between.
+        after = now if self._last_tick is None else self._last_tick
+        self._jobs = jobs
+        self._heap = []
+        for job in jobs.values():
+            self._push(job, after)
+        self._loaded_at = time.monotonic()
+
+    def _stale(self):
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.reload_seconds
+        )
+
+    async def tick(self, database, now=None):
+        async with self._lock:
+            now = time.time() if now is None else now
+            if self._stale():
+                await self.load(database, now)
+
+            # A job that fell due several times since the last tick sends
+            # one command for its current state instead of replaying each.
+            commands = []
+            while len(self._heap) != 0 and self._heap[0][0] <= now:
+                _, _, job = heapq.heappop(self._heap)
+                fired_at, cmd = job.due(now)
+                commands.append(command_for(job.key, fired_at, cmd))
+                self._push(job, now)
+            self._last_tick = now
+
+            if len(commands) == 0:
+                return commands
+            errors = await insert_unordered(database["commands"], commands)
+            commands = [
+                command
+                for index, command in enumerate(commands)
+                if index not in errors
+            ]
+            publish_commands(commands)
+            return commands
+
+    async def run(self, database, interval):
+        while True:
+            try:
+                await self.tick(database)
+            except Exception:
+                logger.exception("Scheduler tick failed")
+            await asyncio.sleep(interval)
+
+    def status(self):
+        return {
+            "jobs": len(self._jobs),
+            "next_fire_at": from_timestamp(self._heap[0][0])
+            if len(self._heap) != 0
+            else None,
+            "last_tick": None
+            if self._last_tick is None
+            else from_timestamp(self._last_tick),
+        }
+
+
+scheduler = Scheduler(
+    reload_seconds=float(os.environ.get("SCHEDULER_RELOAD_SECONDS", 60))
+)
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import CollectionInvalid
+
+from app.database import connect, insert_unordered
+from app.times import to_utc
+
+
+READINGS_TABLE_NAME = "readings"
+TIMESERIES_TABLE_NAME = "readings_ts"
+TIMESERIES_OPTIONS = {
+    "timeField": "created_at",
+    "metaField": "sensor_id",
+    "granularity": "minutes",
+}
+TIMESERIES_INDEXES = [
+    IndexModel(
+        [("sensor_id", ASCENDING), ("created_at", DESCENDING)],
+        name="sensor_id_created_at",
+    ),
+    IndexModel([("created_at", DESCENDING)], name="created_at"),
+]
+
+
+def timeseries_enabled():
+    return os.environ.get("READINGS_STORAGE", "collection") == "timeseries"
+
+
+def readings_collection(database):
+    if timeseries_enabled():
+        return database[TIMESERIES_TABLE_NAME]
+    return database[READINGS_TABLE_NAME]
+
+
+# Time-series documents keep created_at as a native date and drop
+# updated_at, which never differs from created_at for a reading.
+def reading_document(reading):
+    if not timeseries_enabled():
+        return reading
+    return {
+        "_id": reading["_id"],
+        "sensor_id": reading["sensor_id"],
+        "value": reading["value"],
+        "created_at": to_utc(reading["created_at"]),
+    }
+
+
+def reading_time(value, format=None):
+    if not timeseries_enabled():
+        return value
+    if format is not None:
+        return to_utc(datetime.strptime(value, format))
+    return to_utc(value)
+
+
+def reading_from_document(document):
+    if isinstance(created_at := document.get("created_at"), datetime):
+        return {**document, "created_at": jsonable_encoder(to_utc(created_at))}
+    return document
+
+
+# Time-series collections do not enforce a unique _id, so a retried reading
+# would be stored again. Readings whose _id is already stored for the same
+# series and time are reported as duplicates instead, like a unique index
+# would, and skipped.
+async def insert_readings(database, readings):
+    documents = [reading_document(reading) for reading in readings]
+    if not timeseries_enabled():
+        return await insert_unordered(readings_collection(database), documents)
+
+    stored = {
+        document["_id"]
+        async for document in readings_collection(database).find(
+            {
+                "sensor_id": {"$in": [d["sensor_id"] for d in documents]},
+                "created_at": {"$in": [d["created_at"] for d in documents]},
+                "_id": {"$in": [d["_id"] for d in documents]},
+            },
+            {"_id": 1},
+        )
+    }
+    errors = {}
+    pending = []
+    for index, document in enumerate(documents):
+        if document["_id"] in stored:
+            errors[index] = f"Reading {document['_id']} is already stored"
+        else:
+            stored.add(document["_id"])
+            pending.append(index)
+    if len(pending) != 0:
+        inserted = await insert_unordered(
+            readings_collection(database),
+            [documents[index] for index in pending],
+        )
+        for index, errmsg in inserted.items():
+            errors[pending[index]] = errmsg
+    return errors
+
+
+async def ensure_timeseries(database):
+    if not timeseries_enabled():
+        return
+    try:
+        await database.create_collection(
+            TIMESERIES_TABLE_NAME, timeseries=TIMESERIES_OPTIONS
+        )
+    except CollectionInvalid:
+        pass
+    await database[TIMESERIES_TABLE_NAME].create_indexes(TIMESERIES_INDEXES)
+
+
+async def migrate(database, batch_size=1000):
+    target = database[TIMESERIES_TABLE_NAME]
+    if await target.find_one({}, {"_id": 1}) is not None:
+        raise ValueError(f"{TIMESERIES_TABLE_NAME} is not empty")
+    await ensure_timeseries(database)
+
+    migrated = 0
+    cursor = database[READINGS_TABLE_NAME].find().batch_size(batch_size)
+    while len(readings := await cursor.to_list(length=batch_size)) != 0:
+        await insert_unordered(
+            target, [reading_document(reading) for reading in readings]
+        )
+        migrated += len(readings)
+    return migrated
+
+
+async def run(batch_size):
+    client = connect(os.environ["ATLAS_URI"])
+    database = client[os.environ["DB_NAME"]]
+    try:
+        return await migrate(database, batch_size)
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Copy readings into the time-series collection."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="number of readings to copy per insert",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    os.environ["READINGS_STORAGE"] = "timeseries"
+    try:
+        migrated = asyncio.run(run(args.batch_size))
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"migrated {migrated} readings to {TIMESERIES_TABLE_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+
+
+def to_utc(created_at):
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        return created_at.replace(tzinfo=timezone.utc)
+    return created_at.astimezone(timezone.utc)
+
+
+def timestamp(at):
+    return to_utc(at).timestamp()
+
+
+def from_timestamp(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc)
@@ -1,8 +1,10 @@
 import os
+import threading
+import time
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from app.routes.command import router as command_router
 
@@ -16,16 +18,16 @@ app.include_router(command_router, tags=["commands"], prefix="/cmd")
 @app.on_event("startup")
 async def startup_event():
     if os.environ["ATLAS_URI"]:
-        app.mongodb_client = MongoClient(os.environ["ATLAS_URI"])
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
     else:
-        app.mongodb_client = MongoClient()
+        app.mongodb_client = AsyncIOMotorClient()
     app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.database.drop_collection("commands")
     app.mongodb_client.close()
-    app.database.drop_collection("commands")
 
 
 def test_create_command():
@@ -51,12 +53,295 @@ def test_create_command():
         assert "_id" in body
 
 
+def test_create_commands_batch():
+    with TestClient(app) as client:
+        response = client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": ref_id,
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "abc",
+                }
+                for ref_id in ["pump", "light", "fan"]
+            ],
+        )
+        assert response.status_code == 201
+        body = response.json()
+        assert [cmd.get("ref_id") for cmd in body] == ["pump", "light", "fan"]
+        assert len({cmd.get("_id") for cmd in body}) == 3
+
+
+def test_create_commands_partial_failure():
+    with TestClient(app) as client:
+        response = client.post(
+            "/cmd/",
+            json=[
+                {
+                    "_id": "duplicate_cmd",
+                    "ref_id": ref_id,
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "abc",
+                }
+                for ref_id in ["pump", "light"]
+            ],
+        )
+        assert response.status_code == 409
+        errors = response.json().get("detail")
+        assert [error.get("index") for error in errors] == [1]
+        assert errors[0].get("id") == "duplicate_cmd"
+
+        stored = client.get("/cmd/duplicate_cmd")
+        assert stored.status_code == 200
+        assert stored.json().get("ref_id") == "pump"
+
+
+def test_create_command_ignores_lease():
+    with TestClient(app) as client:
+        response = client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": "pump",
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "lease_input_garden",
+                    "lease_id": "client_lease",
+                    "leased_until": "2023-02-17T20:19:00+00:00",
+                }
+            ],
+        )
+        assert response.status_code == 201
+        assert response.json()[0].get("leased_until") is None
+
+        claim = client.post(
+            "/cmd/claim", json={"garden_id": "lease_input_garden"}
+        )
+        assert [cmd.get("ref_id") for cmd in claim.json()["commands"]] == [
+            "pump"
+        ]
+
+
 def test_create_command_missing_field():
     with TestClient(app) as client:
         response = client.post("/cmd/", json={"cmd": 1})
         assert response.status_code == 422
 
 
+def test_claim_commands():
+    with TestClient(app) as client:
+        client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": ref_id,
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "claim_garden",
+                }
+                for ref_id in ["pump", "light", "fan"]
+            ],
+        )
+        first = client.post(
+            "/cmd/claim", json={"garden_id": "claim_garden", "limit": 2}
+        )
+        assert first.status_code == 200
+        first_lease = first.json()
+        assert len(first_lease.get("commands")) == 2
+        assert all(
+            cmd.get("lease_id") == first_lease.get("lease_id")
+            for cmd in first_lease.get("commands")
+        )
+
+        second_lease = client.post(
+            "/cmd/claim", json={"garden_id": "claim_garden", "limit": 2}
+        ).json()
+        assert len(second_lease.get("commands")) == 1
+        claimed = {
+            cmd.get("_id")
+            for cmd in first_lease.get("commands")
+            + second_lease.get("commands")
+        }
+        assert len(claimed) == 3
+
+        third_lease = client.post(
+            "/cmd/claim", json={"garden_id": "claim_garden"}
+        ).json()
+        assert third_lease.get("commands") == []
+
+
+def test_claim_commands_expired_lease():
+    with TestClient(app) as client:
+        client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": "pump",
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "expired_garden",
+                }
+            ],
+        )
+        first_lease = client.post(
+            "/cmd/claim",
+            json={"garden_id": "expired_garden", "lease_seconds": 0.01},
+        ).json()
+        assert len(first_lease.get("commands")) == 1
+        time.sleep(0.05)
+        second_lease = client.post(
+            "/cmd/claim", json={"garden_id": "expired_garden"}
+        ).json()
+        assert len(second_lease.get("commands")) == 1
+        assert second_lease.get("lease_id") != first_lease.get("lease_id")
+
+
+def test_acknowledge_commands():
+    with TestClient(app) as client:
+        client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": ref_id,
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "ack_garden",
+                }
+                for ref_id in ["pump", "light"]
+            ],
+        )
+        lease = client.post(
+            "/cmd/claim", json={"garden_id": "ack_garden"}
+        ).json()
+        ids = [cmd.get("_id") for cmd in lease.get("commands")]
+
+        stale_ack = client.post(
+            "/cmd/ack", json={"ids": ids, "lease_id": "stale_lease"}
+        )
+        assert stale_ack.status_code == 200
+        assert stale_ack.json().get("acknowledged") == 0
+
+        ack = client.post(
+            "/cmd/ack", json={"ids": ids, "lease_id": lease.get("lease_id")}
+        )
+        assert ack.json().get("acknowledged") == 2
+        assert client.get("/cmd/" + ids[0]).json().get("executed") == "true"
+
+
+def test_poll_commands_pending():
+    with TestClient(app) as client:
+        client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": "pump",
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "poll_garden",
+                }
+            ],
+        )
+        response = client.get("/cmd/feed/poll_garden", params={"timeout": 5})
+        assert response.status_code == 200
+        assert [cmd.get("ref_id") for cmd in response.json()] == ["pump"]
+
+
+def test_poll_commands_wakes_on_new_command():
+    with TestClient(app) as client:
+        responses = []
+        poller = threading.Thread(
+            target=lambda: responses.append(
+                client.get("/cmd/feed/wake_garden", params={"timeout": 10})
+            )
+        )
+        started = time.monotonic()
+        poller.start()
+        time.sleep(0.2)
+        client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": "light",
+                    "cmd": 0,
+                    "type": "scheduled actuator",
+                    "garden_id": "wake_garden",
+                }
+            ],
+        )
+        poller.join()
+        assert time.monotonic() - started < 10
+        assert [cmd.get("ref_id") for cmd in responses[0].json()] == ["light"]
+
+
+def test_poll_commands_finds_command_from_other_instance():
+    with TestClient(app) as client:
+        responses = []
+        poller = threading.Thread(
+            target=lambda: responses.append(
+                client.get(
+                    "/cmd/feed/remote_garden",
+                    params={"timeout": 10, "poll": 0.5},
+                )
+            )
+        )
+        started = time.monotonic()
+        poller.start()
+        time.sleep(0.2)
+        # Written straight to the database, as another instance would, so
+        # no wake-up reaches this process's broker.
+        client.portal.call(
+            app.database["commands"].insert_one,
+            {
+                "_id": "remote_cmd",
+                "ref_id": "mister",
+                "cmd": 1,
+                "type": "scheduled actuator",
+                "executed": "false",
+                "garden_id": "remote_garden",
+                "lease_id": None,
+                "leased_until": None,
+                "created_at": "2023-02-17T20:19:00.536083",
+                "updated_at": "2023-02-17T20:19:00.536083",
+            },
+        )
+        poller.join()
+        assert time.monotonic() - started < 5
+        assert [cmd.get("ref_id") for cmd in responses[0].json()] == ["mister"]
+
+
+def test_poll_commands_timeout():
+    with TestClient(app) as client:
+        response = client.get(
+            "/cmd/feed/quiet_garden", params={"timeout": 0.1}
+        )
+        assert response.status_code == 200
+        assert response.json() == []
+
+
+def test_stream_commands():
+    with TestClient(app) as client:
+        client.post(
+            "/cmd/",
+            json=[
+                {
+                    "ref_id": "fan",
+                    "cmd": 1,
+                    "type": "scheduled actuator",
+                    "garden_id": "stream_garden",
+                }
+            ],
+        )
+        response = client.get(
+            "/cmd/stream/stream_garden", params={"timeout": 0.1}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: command" in response.text
+        assert '"ref_id": "fan"' in response.text
+
+
 def test_get_cmd():
     with TestClient(app) as client:
         new_cmd = client.post(
@@ -1,9 +1,11 @@
 import os
+import time
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from app.models.config import ConfigUpdate
 from app.routes.config import router as config_router
 
 load_dotenv()
@@ -16,16 +18,16 @@ app.include_router(config_router, tags=["configs"], prefix="/config")
 @app.on_event("startup")
 async def startup_event():
     if os.environ["ATLAS_URI"]:
-        app.mongodb_client = MongoClient(os.environ["ATLAS_URI"])
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
     else:
-        app.mongodb_client = MongoClient()
+        app.mongodb_client = AsyncIOMotorClient()
     app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.database.drop_collection("configs")
     app.mongodb_client.close()
-    app.database.drop_collection("configs")
 
 
 def test_create_config():
@@ -116,12 +118,140 @@ def test_get_config():
         assert get_config_response.json() == new_config
 
 
+def test_get_config_not_modified():
+    with TestClient(app) as client:
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [{"sensor_id": "abc", "interval": 300}],
+                "ra_schedule": [],
+                "sa_schedule": [],
+            },
+        ).json()
+        get_config_response = client.get("/config/" + new_config.get("_id"))
+        etag = get_config_response.headers.get("etag")
+        assert etag is not None
+        cached_response = client.get(
+            "/config/" + new_config.get("_id"),
+            headers={"If-None-Match": etag},
+        )
+        assert cached_response.status_code == 304
+        assert cached_response.headers.get("etag") == etag
+        assert cached_response.content == b""
+        stale_response = client.get(
+            "/config/" + new_config.get("_id"),
+            headers={"If-None-Match": '"stale"'},
+        )
+        assert stale_response.status_code == 200
+        assert stale_response.json() == new_config
+
+
 def test_get_config_unexisting():
     with TestClient(app) as client:
         get_config_response = client.get("/config/unexisting_id")
         assert get_config_response.status_code == 404
 
 
+def test_get_config_state():
+    with TestClient(app) as client:
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [],
+                "ra_schedule": [],
+                "sa_schedule": [
+                    {
+                        "sa_id": "ccd",
+                        "on": [
+                            "2023-02-17T08:09:50+0000",
+                            "2023-02-17T20:09:50+0000",
+                        ],
+                        "off": [
+                            "2023-02-17T08:29:50+0000",
+                            "2023-02-17T20:29:50+0000",
+                        ],
+                    }
+                ],
+            },
+        ).json()
+        response = client.get(
+            "/config/" + new_config.get("_id") + "/state",
+            params={"at": "2024-05-01T08:15:00+00:00"},
+        )
+        assert response.status_code == 200
+        state = response.json().get("actuators")[0]
+        assert state.get("sa_id") == "ccd"
+        assert state.get("on") is True
+        assert state.get("since") == "2024-05-01T08:09:50Z"
+        assert state.get("until") == "2024-05-01T08:29:50Z"
+
+        response = client.get(
+            "/config/" + new_config.get("_id") + "/state",
+            params={"at": "2024-05-01T07:00:00+00:00"},
+        )
+        state = response.json().get("actuators")[0]
+        assert state.get("on") is False
+        assert state.get("since") == "2024-04-30T20:29:50Z"
+        assert state.get("until") == "2024-05-01T08:09:50Z"
+
+
+def test_get_config_state_unexisting():
+    with TestClient(app) as client:
+        response = client.get("/config/unexisting_id/state")
+        assert response.status_code == 404
+
+
+def test_list_config_transitions():
+    with TestClient(app) as client:
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [],
+                "ra_schedule": [],
+                "sa_schedule": [
+                    {
+                        "sa_id": "ccd",
+                        "on": ["2023-02-17T08:09:50+0000"],
+                        "off": ["2023-02-17T08:29:50+0000"],
+                    },
+                    {
+                        "sa_id": "dde",
+                        "on": ["2023-02-17T22:00:00+0000"],
+                        "off": ["2023-02-17T02:00:00+0000"],
+                    },
+                ],
+            },
+        ).json()
+        response = client.get(
+            "/config/" + new_config.get("_id") + "/transitions",
+            params={
+                "from": "2024-05-01T00:00:00+00:00",
+                "to": "2024-05-02T00:00:00+00:00",
+            },
+        )
+        assert response.status_code == 200
+        assert [
+            (t.get("sa_id"), t.get("at"), t.get("on")) for t in response.json()
+        ] == [
+            ("dde", "2024-05-01T02:00:00Z", False),
+            ("ccd", "2024-05-01T08:09:50Z", True),
+            ("ccd", "2024-05-01T08:29:50Z", False),
+            ("dde", "2024-05-01T22:00:00Z", True),
+        ]
+
+        response = client.get(
+            "/config/" + new_config.get("_id") + "/transitions",
+            params={
+                "from": "2024-05-02T00:00:00+00:00",
+                "to": "2024-05-01T00:00:00+00:00",
+            },
+        )
+        assert response.status_code == 400
+
+
 def test_update_config():
     with TestClient(app) as client:
         new_config = client.post(
@@ -163,3 +293,15 @@ def test_update_config():
         assert response.json().get("sensor_schedule") == [
             {"sensor_id": "abc", "interval": 400}
         ]
+
+
+def test_config_update_stamps_updated_at():
+    fields = {
+        "name": "Config",
+        "sensor_schedule": None,
+        "ra_schedule": None,
+        "sa_schedule": None,
+    }
+    first = ConfigUpdate(**fields)
+    time.sleep(0.01)
+    assert ConfigUpdate(**fields).updated_at > first.updated_at
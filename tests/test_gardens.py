@@ -2,30 +2,39 @@ import os
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from app.pods import embed, find_pods, insert_pods, replace_pods
+from app.routes.config import router as config_router
 from app.routes.garden import router as garden_router
+from app.routes.reactive_actuator import router as ra_router
+from app.routes.scheduled_actuator import router as sa_router
+from app.routes.sensor import router as sensor_router
 
 load_dotenv()
 
 
 app = FastAPI()
 app.include_router(garden_router, tags=["gardens"], prefix="/garden")
+app.include_router(config_router, tags=["configs"], prefix="/config")
+app.include_router(sensor_router, tags=["sensors"], prefix="/sensor")
+app.include_router(sa_router, tags=["scheduled_actuators"], prefix="/sa")
+app.include_router(ra_router, tags=["reactive_actuators"], prefix="/ra")
 
 
 @app.on_event("startup")
 async def startup_event():
     if os.environ["ATLAS_URI"]:
-        app.mongodb_client = MongoClient(os.environ["ATLAS_URI"])
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
     else:
-        app.mongodb_client = MongoClient()
+        app.mongodb_client = AsyncIOMotorClient()
     app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.database.drop_collection("gardens")
     app.mongodb_client.close()
-    app.database.drop_collection("gardens")
 
 
 def test_create_garden():
@@ -76,12 +85,188 @@ def test_get_garden():
         assert get_garden_response.json() == new_garden
 
 
+def test_get_garden_not_modified():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        etag = client.get("/garden/" + new_garden.get("_id")).headers["etag"]
+        cached_response = client.get(
+            "/garden/" + new_garden.get("_id"),
+            headers={"If-None-Match": "W/" + etag},
+        )
+        assert cached_response.status_code == 304
+
+
 def test_get_garden_unexisting():
     with TestClient(app) as client:
         get_garden_response = client.get("/garden/unexisting_id")
         assert get_garden_response.status_code == 404
 
 
+def test_get_garden_tree():
+    with TestClient(app) as client:
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [],
+                "ra_schedule": [],
+                "sa_schedule": [],
+            },
+        ).json()
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": new_config.get("_id"),
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        new_sa = client.post(
+            "/sa/", json={"name": "light", "garden_id": new_garden.get("_id")}
+        ).json()
+        new_ra = client.post(
+            "/ra/", json={"name": "pump", "sensor_id": new_sensor.get("_id")}
+        ).json()
+        client.post("/sensor/", json={"name": "pH", "garden_id": "other"})
+
+        response = client.get("/garden/" + new_garden.get("_id") + "/tree")
+        assert response.status_code == 200
+        body = response.json()
+        assert body.get("_id") == new_garden.get("_id")
+        assert body.get("config") == new_config
+        assert body.get("sensors") == [new_sensor]
+        assert body.get("scheduled_actuators") == [new_sa]
+        assert body.get("reactive_actuators") == [new_ra]
+
+
+def test_get_garden_tree_unexisting():
+    with TestClient(app) as client:
+        response = client.get("/garden/unexisting_id/tree")
+        assert response.status_code == 404
+
+
+def test_pods_collection_storage():
+    os.environ["PODS_STORAGE"] = "collection"
+    try:
+        with TestClient(app) as client:
+            new_garden = client.post(
+                "/garden/",
+                json={
+                    "name": "Don Quixote",
+                    "location": "Miguel de Cervantes",
+                    "config_id": "abc",
+                },
+            ).json()
+            garden_id = new_garden.get("_id")
+            response = client.post(
+                "/garden/pod/",
+                json={
+                    "name": "Johns Lettuce",
+                    "garden_id": garden_id,
+                    "location": [1, 3],
+                    "plant": "Lettuce",
+                },
+            )
+            assert response.status_code == 201
+            pod = response.json().get("pods")[0]
+            assert pod.get("name") == "Johns Lettuce"
+
+            stored = client.portal.call(
+                app.database["gardens"].find_one, {"_id": garden_id}
+            )
+            assert "pods" not in stored
+            response = client.put(
+                "/garden/pod/" + pod.get("_id"),
+                json={
+                    "name": "Jack Lettuce",
+                    "garden_id": garden_id,
+                    "location": [2, 6],
+                    "plant": "Lettuce",
+                },
+            )
+            assert response.status_code == 200
+            assert response.json().get("_id") == garden_id
+
+            pods = client.get("/garden/" + garden_id + "/pods").json()
+            assert [(p.get("name"), p.get("location")) for p in pods] == [
+                ("Jack Lettuce", [2, 6])
+            ]
+            garden = client.get("/garden/" + garden_id).json()
+            assert garden.get("pods") == pods
+            response = client.put(
+                "/garden/pod/unexisting_id",
+                json={
+                    "name": "Jack Lettuce",
+                    "garden_id": garden_id,
+                    "location": [2, 6],
+                    "plant": "Lettuce",
+                },
+            )
+            assert response.status_code == 404
+    finally:
+        del os.environ["PODS_STORAGE"]
+
+
+def test_pods_collection_replace_and_embed():
+    with TestClient(app) as client:
+        garden_id = (
+            client.post(
+                "/garden/",
+                json={
+                    "name": "Don Quixote",
+                    "location": "Miguel de Cervantes",
+                    "config_id": "abc",
+                },
+            )
+            .json()
+            .get("_id")
+        )
+        client.portal.call(
+            insert_pods,
+            app.database,
+            garden_id,
+            [
+                {"_id": "kept_pod", "name": "Basil", "location": [1, 1]},
+                {"_id": "dropped_pod", "name": "Kale", "location": [1, 2]},
+            ],
+        )
+        client.portal.call(
+            replace_pods,
+            app.database,
+            garden_id,
+            [
+                {"_id": "kept_pod", "name": "Thai Basil", "location": [1, 1]},
+                {"_id": "new_pod", "name": "Mint", "location": [2, 1]},
+            ],
+        )
+        pods = client.portal.call(find_pods, app.database, garden_id)
+        assert sorted((pod["_id"], pod["name"]) for pod in pods) == [
+            ("kept_pod", "Thai Basil"),
+            ("new_pod", "Mint"),
+        ]
+
+        client.portal.call(embed, app.database)
+        garden = client.get("/garden/" + garden_id).json()
+        assert sorted(pod.get("name") for pod in garden.get("pods")) == [
+            "Mint",
+            "Thai Basil",
+        ]
+        client.portal.call(
+            app.database["pods"].delete_many, {"garden_id": garden_id}
+        )
+
+
 def test_update_garden():
     with TestClient(app) as client:
         new_garden = client.post(
@@ -0,0 +1,47 @@
+import asyncio
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, IndexModel
+from dotenv import load_dotenv
+from app.indexes import (
+    INDEXES,
+    ensure_indexes,
+    missing_indexes,
+    uncovered_queries,
+)
+
+load_dotenv()
+
+
+async def ensure_indexes_twice():
+    if os.environ["ATLAS_URI"]:
+        client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
+    else:
+        client = AsyncIOMotorClient()
+    database = client[os.environ["DB_NAME"] + "test"]
+    await ensure_indexes(database)
+    first = await missing_indexes(database)
+    await ensure_indexes(database)
+    second = await missing_indexes(database)
+    for collection in INDEXES:
+        await database.drop_collection(collection)
+    client.close()
+    return first, second
+
+
+def test_ensure_indexes():
+    assert asyncio.run(ensure_indexes_twice()) == ([], [])
+
+
+def test_route_queries_covered():
+    assert uncovered_queries() == []
+
+
+def test_uncovered_query_reported():
+    indexes = {"readings": [IndexModel([("created_at", ASCENDING)])]}
+    route_queries = {
+        "list_readings": ("readings", ["created_at"]),
+        "find_readings": ("readings", ["sensor_id", "created_at"]),
+    }
+    assert uncovered_queries(indexes, route_queries) == ["find_readings"]
@@ -1,16 +1,25 @@
 from datetime import datetime
+import csv
+import json
 import os
+import struct
+import threading
+import time
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from pymongo.errors import AutoReconnect
+import pytest
 import pytz
 from app.routes.sensor import router as sensor_router
 from app.routes.garden import router as garden_router
 from app.routes.reactive_actuator import router as ra_router
 from app.routes.scheduled_actuator import router as sa_router
 from app.routes.logging import router as logging_router
+from app.rollups import backfill
+from app.rules import RuleEngine, rules
 
 load_dotenv()
 
@@ -27,16 +36,16 @@ ISO8601_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
 @app.on_event("startup")
 async def startup_event():
     if os.environ["ATLAS_URI"]:
-        app.mongodb_client = MongoClient(os.environ["ATLAS_URI"])
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
     else:
-        app.mongodb_client = MongoClient()
+        app.mongodb_client = AsyncIOMotorClient()
     app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.database.drop_collection("gardens")
     app.mongodb_client.close()
-    app.database.drop_collection("gardens")
 
 
 def test_create_reading():
@@ -68,28 +77,713 @@ def test_create_reading():
         assert "created_at" in body
 
 
+def test_create_reading_deleted_sensor():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        response = client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        )
+        assert response.status_code == 201
+        client.delete("/sensor/" + new_sensor.get("_id"))
+        response = client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        )
+        assert response.status_code == 404
+
+
+def test_create_reading_triggers_reactive_actuator():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "reactive-config",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        new_ra = client.post(
+            "/ra/",
+            json={"name": "ph down pump", "sensor_id": new_sensor.get("_id")},
+        ).json()
+        client.portal.call(
+            app.database["configs"].insert_one,
+            {
+                "_id": "reactive-config",
+                "name": "Config",
+                "sensor_schedule": [],
+                "ra_schedule": [
+                    {
+                        "ra_id": new_ra.get("_id"),
+                        "interval": 1200,
+                        "threshold": 7.5,
+                        "duration": 5,
+                        "threshold_type": 1,
+                    }
+                ],
+                "sa_schedule": [],
+            },
+        )
+        rules.invalidate()
+
+        for value in ["7", "8", "9"]:
+            response = client.post(
+                "/sensors/logging/",
+                json={"sensor_id": new_sensor.get("_id"), "value": value},
+            )
+            assert response.status_code == 201
+
+        commands = client.portal.call(
+            lambda: app.database["commands"]
+            .find({"ref_id": new_ra.get("_id")})
+            .to_list(length=None)
+        )
+        assert sorted(command["cmd"] for command in commands) == [0, 1]
+        for command in commands:
+            assert command["type"] == "reactive actuator"
+            assert command["garden_id"] == new_garden.get("_id")
+            if command["cmd"] == 0:
+                assert command["leased_until"] is not None
+            else:
+                assert command["leased_until"] is None
+        client.portal.call(
+            app.database["configs"].delete_one, {"_id": "reactive-config"}
+        )
+
+
+def test_create_reactive_actuator_loads_rule():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "late-ra-config",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        client.portal.call(
+            app.database["configs"].insert_one,
+            {
+                "_id": "late-ra-config",
+                "name": "Config",
+                "sensor_schedule": [],
+                "ra_schedule": [
+                    {
+                        "ra_id": "late-ra",
+                        "interval": 1200,
+                        "threshold": 7.5,
+                        "duration": 5,
+                        "threshold_type": 1,
+                    }
+                ],
+                "sa_schedule": [],
+            },
+        )
+        rules.invalidate()
+        client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        )
+        client.post(
+            "/ra/",
+            json={
+                "_id": "late-ra",
+                "name": "ph down pump",
+                "sensor_id": new_sensor.get("_id"),
+            },
+        )
+        client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "9"},
+        )
+
+        commands = client.portal.call(
+            lambda: app.database["commands"]
+            .find({"ref_id": "late-ra"})
+            .to_list(length=None)
+        )
+        assert sorted(command["cmd"] for command in commands) == [0, 1]
+        client.portal.call(
+            app.database["configs"].delete_one, {"_id": "late-ra-config"}
+        )
+
+
+def test_create_reading_with_malformed_rules():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "malformed-rules-config",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        new_ra = client.post(
+            "/ra/",
+            json={"name": "ph down pump", "sensor_id": new_sensor.get("_id")},
+        ).json()
+        client.portal.call(
+            app.database["configs"].insert_one,
+            {
+                "_id": "malformed-rules-config",
+                "name": "Config",
+                "ra_schedule": [
+                    {"ra_id": new_ra.get("_id"), "interval": 1200},
+                    {
+                        "ra_id": new_ra.get("_id"),
+                        "interval": 1200,
+                        "threshold": "high",
+                        "duration": 5,
+                        "threshold_type": 1,
+                    },
+                ],
+            },
+        )
+        rules.invalidate()
+
+        response = client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "9"},
+        )
+        assert response.status_code == 201
+        response = client.post(
+            "/sensors/logging/batch",
+            json=[{"sensor_id": new_sensor.get("_id"), "value": "9"}],
+        )
+        assert response.status_code == 201
+        client.portal.call(
+            app.database["configs"].delete_one,
+            {"_id": "malformed-rules-config"},
+        )
+
+
+class UnavailableCommands:
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name):
+        if name == "commands":
+            return self
+        return self.database[name]
+
+    async def insert_many(self, *args, **kwargs):
+        raise AutoReconnect("commands unavailable")
+
+
+def test_reactive_actuator_retries_failed_insert():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "retry-config",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        new_ra = client.post(
+            "/ra/",
+            json={"name": "ph down pump", "sensor_id": new_sensor.get("_id")},
+        ).json()
+        client.portal.call(
+            app.database["configs"].insert_one,
+            {
+                "_id": "retry-config",
+                "name": "Config",
+                "sensor_schedule": [],
+                "ra_schedule": [
+                    {
+                        "ra_id": new_ra.get("_id"),
+                        "interval": 1200,
+                        "threshold": 7.5,
+                        "duration": 5,
+                        "threshold_type": 1,
+                    }
+                ],
+                "sa_schedule": [],
+            },
+        )
+        engine = RuleEngine()
+        reading = {
+            "_id": "retry-reading",
+            "sensor_id": new_sensor.get("_id"),
+            "value": 9.0,
+        }
+        with pytest.raises(AutoReconnect):
+            client.portal.call(
+                engine.evaluate,
+                UnavailableCommands(app.database),
+                [reading],
+                4102444800.0,
+            )
+        commands = client.portal.call(
+            engine.evaluate, app.database, [reading], 4102444800.0
+        )
+        assert sorted(command["cmd"] for command in commands) == [0, 1]
+        client.portal.call(
+            app.database["configs"].delete_one, {"_id": "retry-config"}
+        )
+
+
+def test_reactive_actuator_cooldown():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "cooldown-config",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        new_ra = client.post(
+            "/ra/",
+            json={"name": "ph down pump", "sensor_id": new_sensor.get("_id")},
+        ).json()
+        client.portal.call(
+            app.database["configs"].insert_one,
+            {
+                "_id": "cooldown-config",
+                "name": "Config",
+                "sensor_schedule": [],
+                "ra_schedule": [
+                    {
+                        "ra_id": new_ra.get("_id"),
+                        "interval": 1200,
+                        "threshold": 7.5,
+                        "duration": 5,
+                        "threshold_type": 1,
+                    }
+                ],
+                "sa_schedule": [],
+            },
+        )
+        engine = RuleEngine()
+        fired = []
+        # 4102445999 is one second before a 1200s boundary, so epoch
+        # aligned windows would fire again two seconds later.
+        for index, now in enumerate(
+            [4102445999.0, 4102446001.0, 4102447198.0, 4102447199.0]
+        ):
+            reading = {
+                "_id": f"cooldown-reading-{index}",
+                "sensor_id": new_sensor.get("_id"),
+                "value": 9.0,
+            }
+            commands = client.portal.call(
+                engine.evaluate, app.database, [reading], now
+            )
+            fired += [
+                command["created_at"] for command in commands if command["cmd"]
+            ]
+        assert fired == [
+            datetime.fromtimestamp(at, pytz.timezone("US/Eastern")).isoformat()
+            for at in [4102445999.0, 4102447199.0]
+        ]
+        client.portal.call(
+            app.database["configs"].delete_one, {"_id": "cooldown-config"}
+        )
+
+
 def test_create_reading_missing_sensor_id():
     with TestClient(app) as client:
-        response = client.post("/sensors/logging/", json={"value": "5"})
-        assert response.status_code == 422
+        response = client.post("/sensors/logging/", json={"value": "5"})
+        assert response.status_code == 422
+
+
+def test_create_reading_missing_value():
+    with TestClient(app) as client:
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": "066de609-b04a-4b30-b46c-32537c7f1f6e",
+            },
+        ).json()
+        response = client.post(
+            "/sensors/logging/", json={"sensor_id": new_sensor.get("_id")}
+        )
+        assert response.status_code == 422
+
+
+def test_create_reading_batch():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        response = client.post(
+            "/sensors/logging/batch",
+            json=[
+                {"sensor_id": new_sensor.get("_id"), "value": "5"},
+                {"sensor_id": new_sensor.get("_id"), "value": "6"},
+            ],
+        )
+        assert response.status_code == 201
+        body = response.json()
+        assert body.get("inserted_count") == 2
+        assert body.get("failed_count") == 0
+        assert [item.get("status") for item in body.get("items")] == [
+            201,
+            201,
+        ]
+        reading_id = body.get("items")[1].get("_id")
+        reading = client.portal.call(
+            app.database["readings"].find_one, {"_id": reading_id}
+        )
+        assert reading.get("value") == 6
+
+
+def test_create_reading_batch_unexisting_sensor_id():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        response = client.post(
+            "/sensors/logging/batch",
+            json=[
+                {"sensor_id": "unexisting_id", "value": "5"},
+                {"sensor_id": new_sensor.get("_id"), "value": "6"},
+            ],
+        )
+        assert response.status_code == 207
+        body = response.json()
+        assert body.get("inserted_count") == 1
+        assert body.get("failed_count") == 1
+        assert body.get("items")[0].get("status") == 404
+        assert body.get("items")[1].get("status") == 201
+
+
+def test_create_reading_batch_missing_value():
+    with TestClient(app) as client:
+        response = client.post(
+            "/sensors/logging/batch", json=[{"sensor_id": "abc"}]
+        )
+        assert response.status_code == 422
+
+
+def test_stream_readings():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        responses = []
+        listener = threading.Thread(
+            target=lambda: responses.append(
+                client.get(
+                    "/sensors/logging/stream",
+                    params={
+                        "sensor_id": new_sensor.get("_id"),
+                        "garden_id": new_garden.get("_id"),
+                        "timeout": 1,
+                    },
+                )
+            )
+        )
+        listener.start()
+        time.sleep(0.2)
+        new_reading = client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        ).json()
+        listener.join()
+        assert responses[0].status_code == 200
+        assert responses[0].text.count("event: reading") == 1
+        assert new_reading.get("_id") in responses[0].text
+
+
+def test_stream_readings_missing_filter():
+    with TestClient(app) as client:
+        response = client.get("/sensors/logging/stream")
+        assert response.status_code == 400
+
+
+def test_export_readings():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        client.post(
+            "/sensors/logging/batch",
+            json=[
+                {
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": str(value),
+                    "created_at": f"2023-03-0{value}T10:00:00.000000+00:00",
+                }
+                for value in [3, 1, 2]
+            ],
+        )
+
+        response = client.get(
+            "/sensors/logging/export",
+            params={"sensor_id": new_sensor.get("_id"), "batch_size": 2},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row.get("value") for row in rows] == [1, 2, 3]
+
+        response = client.get(
+            "/sensors/logging/export",
+            params={
+                "format": "csv",
+                "garden_id": new_garden.get("_id"),
+                "start": "2023-03-02T00:00:00.000000+0000",
+            },
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        rows = list(csv.DictReader(response.text.splitlines()))
+        assert [row.get("value") for row in rows] == ["2.0", "3.0"]
+        assert rows[0].get("sensor_id") == new_sensor.get("_id")
+
+
+def test_export_readings_invalid_format():
+    with TestClient(app) as client:
+        response = client.get(
+            "/sensors/logging/export", params={"format": "xml"}
+        )
+        assert response.status_code == 400
+
+
+def test_list_reading():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        new_reading = client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        ).json()
+        start = new_reading.get("created_at")
+        end = datetime.now(pytz.timezone("US/Eastern")).strftime(
+            ISO8601_FORMAT
+        )
+        get_reading_response = client.get(
+            "/sensors/logging/" + "?start=" + start + "&end=" + end
+        )
+        print(new_garden)
+        print(new_sensor)
+        print(new_reading)
+        print(get_reading_response.json())
+        # assert get_reading_response.status_code == 200
+        # assert get_reading_response.json()[0] == new_reading
+
+
+def test_list_reading_invalid_time():
+    with TestClient(app) as client:
+        get_reading_response = client.get(
+            "/sensors/logging/" + "?start=1234" + "&end=5678"
+        )
+        assert get_reading_response.status_code == 400
+
+
+def test_find_reading():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        new_reading = client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        ).json()
+        start = new_reading.get("created_at")
+        end = datetime.now(pytz.timezone("US/Eastern")).strftime(
+            ISO8601_FORMAT
+        )
+        get_reading_response = client.get(
+            "/sensors/logging/"
+            + new_reading.get("sensor_id")
+            + "?start="
+            + start
+            + "&end="
+            + end
+        )
+        assert get_reading_response.status_code == 200
+        assert get_reading_response.json()[0] == new_reading
+
+
+def test_find_reading_default_window():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        new_reading = client.post(
+            "/sensors/logging/",
+            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        ).json()
+        get_reading_response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id")
+        )
+        assert get_reading_response.status_code == 200
+        assert [r.get("_id") for r in get_reading_response.json()] == [
+            new_reading.get("_id")
+        ]
 
 
-def test_create_reading_missing_value():
+def test_find_reading_limit():
     with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
         new_sensor = client.post(
             "/sensor/",
             json={
                 "name": "Humidity",
-                "garden_id": "066de609-b04a-4b30-b46c-32537c7f1f6e",
+                "garden_id": new_garden.get("_id"),
             },
         ).json()
-        response = client.post(
-            "/sensors/logging/", json={"sensor_id": new_sensor.get("_id")}
+        for value in ["5", "6", "7"]:
+            client.post(
+                "/sensors/logging/",
+                json={
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": value,
+                    "created_at": f"2023-07-0{value}T10:00:00.000000+00:00",
+                },
+            )
+        start = "2023-07-01T00:00:00.000000+0000"
+        end = "2023-08-01T00:00:00.000000+0000"
+        get_reading_response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id"),
+            params={"start": start, "end": end, "limit": 2},
         )
-        assert response.status_code == 422
+        assert get_reading_response.status_code == 200
+        assert [
+            reading.get("value") for reading in get_reading_response.json()
+        ] == [7.0, 6.0]
+
+        get_reading_response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id"),
+            params={"start": start, "end": end, "limit": 0},
+        )
+        assert get_reading_response.status_code == 422
 
 
-def test_list_reading():
+def test_find_reading_columnar():
     with TestClient(app) as client:
         new_garden = client.post(
             "/garden/",
@@ -106,34 +800,243 @@ def test_list_reading():
                 "garden_id": new_garden.get("_id"),
             },
         ).json()
-        new_reading = client.post(
-            "/sensors/logging/",
-            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+        client.post(
+            "/sensors/logging/batch",
+            json=[
+                {
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": str(value),
+                    "created_at": f"2023-04-0{value}T10:00:00.000000+00:00",
+                }
+                for value in [1, 2, 3]
+            ],
+        )
+        response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id"),
+            params={
+                "start": "2023-04-01T00:00:00.000000+0000",
+                "end": "2023-04-05T00:00:00.000000+0000",
+                "limit": 2,
+            },
+            headers={"Accept": "application/vnd.hydrangea.readings"},
+        )
+        assert response.status_code == 200
+        assert (
+            response.headers["content-type"]
+            == "application/vnd.hydrangea.readings"
+        )
+        assert response.headers["vary"] == "Accept"
+        assert "x-next-cursor" in response.headers
+        (count,) = struct.unpack_from("<Q", response.content)
+        assert count == 2
+        timestamps = struct.unpack_from("<2q", response.content, 8)
+        values = struct.unpack_from("<2d", response.content, 24)
+        assert values == (3.0, 2.0)
+        assert timestamps == (
+            int(datetime(2023, 4, 3, 10, tzinfo=pytz.utc).timestamp())
+            * 1000000,
+            int(datetime(2023, 4, 2, 10, tzinfo=pytz.utc).timestamp())
+            * 1000000,
+        )
+
+        response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id"),
+            params={
+                "start": "2023-04-01T00:00:00.000000+0000",
+                "end": "2023-04-05T00:00:00.000000+0000",
+            },
+        )
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["vary"] == "Accept"
+
+
+def test_find_reading_timeseries_storage():
+    os.environ["READINGS_STORAGE"] = "timeseries"
+    try:
+        with TestClient(app) as client:
+            new_garden = client.post(
+                "/garden/",
+                json={
+                    "name": "Don Quixote",
+                    "location": "Miguel de Cervantes",
+                    "config_id": "abc",
+                },
+            ).json()
+            new_sensor = client.post(
+                "/sensor/",
+                json={
+                    "name": "Humidity",
+                    "garden_id": new_garden.get("_id"),
+                },
+            ).json()
+            response = client.post(
+                "/sensors/logging/batch",
+                json=[
+                    {
+                        "sensor_id": new_sensor.get("_id"),
+                        "value": str(value),
+                        "created_at": f"2023-05-0{value}T10:00:00+00:00",
+                    }
+                    for value in [1, 2, 3]
+                ],
+            )
+            reading_id = response.json().get("items")[0].get("_id")
+            stored = client.portal.call(
+                app.database["readings_ts"].find_one, {"_id": reading_id}
+            )
+            assert isinstance(stored.get("created_at"), datetime)
+            assert "updated_at" not in stored
+
+            params = {
+                "start": "2023-05-01T00:00:00.000000+0000",
+                "end": "2023-05-03T00:00:00.000000+0000",
+                "limit": 1,
+            }
+            response = client.get(
+                "/sensors/logging/" + new_sensor.get("_id"), params=params
+            )
+            assert response.status_code == 200
+            assert [r.get("value") for r in response.json()] == [2]
+            assert response.json()[0].get("created_at") == (
+                "2023-05-02T10:00:00Z"
+            )
+            params["cursor"] = response.headers["x-next-cursor"]
+            response = client.get(
+                "/sensors/logging/" + new_sensor.get("_id"), params=params
+            )
+            assert [r.get("value") for r in response.json()] == [1]
+            assert "x-next-cursor" not in response.headers
+    finally:
+        del os.environ["READINGS_STORAGE"]
+
+
+def test_create_reading_batch_retry_timeseries_storage():
+    os.environ["READINGS_STORAGE"] = "timeseries"
+    try:
+        with TestClient(app) as client:
+            new_garden = client.post(
+                "/garden/",
+                json={
+                    "name": "Don Quixote",
+                    "location": "Miguel de Cervantes",
+                    "config_id": "abc",
+                },
+            ).json()
+            new_sensor = client.post(
+                "/sensor/",
+                json={
+                    "name": "Humidity",
+                    "garden_id": new_garden.get("_id"),
+                },
+            ).json()
+            batch = [
+                {
+                    "_id": f"ts_retry_{value}",
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": str(value),
+                    "created_at": f"2023-09-0{value}T10:00:00+00:00",
+                }
+                for value in [1, 2]
+            ]
+            response = client.post("/sensors/logging/batch", json=batch)
+            assert response.status_code == 201
+
+            response = client.post(
+                "/sensors/logging/batch",
+                json=batch
+                + [
+                    {
+                        "_id": "ts_retry_3",
+                        "sensor_id": new_sensor.get("_id"),
+                        "value": "3",
+                        "created_at": "2023-09-03T10:00:00+00:00",
+                    }
+                ],
+            )
+            assert response.status_code == 207
+            body = response.json()
+            assert body.get("inserted_count") == 1
+            assert [item.get("status") for item in body.get("items")] == [
+                409,
+                409,
+                201,
+            ]
+            assert "already stored" in body.get("items")[0].get("detail")
+
+            response = client.post("/sensors/logging/", json=batch[0])
+            assert response.status_code == 409
+
+            response = client.get(
+                "/sensors/logging/" + new_sensor.get("_id") + "/rollups",
+                params={
+                    "period": "day",
+                    "start": "2023-09-01T00:00:00.000000+0000",
+                    "end": "2023-09-04T00:00:00.000000+0000",
+                },
+            )
+            assert [day.get("count") for day in response.json()] == [1, 1, 1]
+    finally:
+        del os.environ["READINGS_STORAGE"]
+
+
+def test_find_reading_pages():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
         ).json()
-        start = new_reading.get("created_at")
-        end = datetime.now(pytz.timezone("US/Eastern")).strftime(
-            ISO8601_FORMAT
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "Humidity",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        for value in ["5", "6", "7"]:
+            client.post(
+                "/sensors/logging/",
+                json={
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": value,
+                    "created_at": f"2023-08-0{value}T10:00:00.000000+00:00",
+                },
+            )
+        params = {
+            "start": "2023-08-01T00:00:00.000000+0000",
+            "end": "2023-09-01T00:00:00.000000+0000",
+            "limit": 2,
+        }
+        first_page = client.get(
+            "/sensors/logging/" + new_sensor.get("_id"), params=params
         )
-        get_reading_response = client.get(
-            "/sensors/logging/" + "?start=" + start + "&end=" + end
+        assert first_page.status_code == 200
+        assert len(first_page.json()) == 2
+        assert "X-Next-Cursor" in first_page.headers
+
+        params["cursor"] = first_page.headers["X-Next-Cursor"]
+        second_page = client.get(
+            "/sensors/logging/" + new_sensor.get("_id"), params=params
         )
-        print(new_garden)
-        print(new_sensor)
-        print(new_reading)
-        print(get_reading_response.json())
-        # assert get_reading_response.status_code == 200
-        # assert get_reading_response.json()[0] == new_reading
+        assert second_page.status_code == 200
+        assert len(second_page.json()) == 1
+        assert "X-Next-Cursor" not in second_page.headers
+        ids = {r["_id"] for r in first_page.json() + second_page.json()}
+        assert len(ids) == 3
 
 
-def test_list_reading_invalid_time():
+def test_find_reading_invalid_cursor():
     with TestClient(app) as client:
         get_reading_response = client.get(
-            "/sensors/logging/" + "?start=1234" + "&end=5678"
+            "/sensors/logging/123456789", params={"cursor": "notacursor"}
         )
         assert get_reading_response.status_code == 400
 
 
-def test_find_reading():
+def test_find_reading_series():
     with TestClient(app) as client:
         new_garden = client.post(
             "/garden/",
@@ -146,28 +1049,223 @@ def test_find_reading():
         new_sensor = client.post(
             "/sensor/",
             json={
-                "name": "Humidity",
+                "name": "pH",
                 "garden_id": new_garden.get("_id"),
             },
         ).json()
-        new_reading = client.post(
+        client.post(
+            "/sensors/logging/batch",
+            json=[
+                {
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": value,
+                    "created_at": created_at,
+                }
+                for value, created_at in [
+                    (6.0, "2023-02-17T20:01:00.000000-05:00"),
+                    (7.0, "2023-02-17T20:02:00.000000-05:00"),
+                    (5.0, "2023-02-17T20:20:00.000000-05:00"),
+                ]
+            ],
+        )
+        response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id") + "/series",
+            params={
+                "interval": "15m",
+                "start": "2023-02-17T20:00:00.000000-0500",
+                "end": "2023-02-17T21:00:00.000000-0500",
+            },
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body) == 2
+        assert body[0].get("start").startswith("2023-02-18T01:00:00")
+        assert body[0].get("count") == 2
+        assert body[0].get("min") == 6.0
+        assert body[0].get("max") == 7.0
+        assert body[0].get("mean") == 6.5
+        assert body[1].get("count") == 1
+
+
+def test_find_reading_series_invalid_interval():
+    with TestClient(app) as client:
+        response = client.get(
+            "/sensors/logging/123456789/series", params={"interval": "1w"}
+        )
+        assert response.status_code == 400
+
+
+def test_find_reading_rollups():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "pH",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        client.post(
+            "/sensors/logging/batch",
+            json=[
+                {
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": value,
+                    "created_at": created_at,
+                }
+                for value, created_at in [
+                    (6.0, "2023-02-17T20:05:00.000000-05:00"),
+                    (8.0, "2023-02-17T20:10:00.000000-05:00"),
+                    (5.0, "2023-02-17T21:30:00.000000-05:00"),
+                ]
+            ],
+        )
+        client.post(
             "/sensors/logging/",
-            json={"sensor_id": new_sensor.get("_id"), "value": "5"},
+            json={
+                "sensor_id": new_sensor.get("_id"),
+                "value": 4.0,
+                "created_at": "2023-02-17T20:01:00.000000-05:00",
+            },
+        )
+        params = {
+            "start": "2023-02-17T00:00:00.000000-0500",
+            "end": "2023-02-18T00:00:00.000000-0500",
+        }
+        response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id") + "/rollups",
+            params=params,
+        )
+        assert response.status_code == 200
+        hours = response.json()
+        assert [hour.get("count") for hour in hours] == [3, 1]
+        assert hours[0].get("min") == 4.0
+        assert hours[0].get("max") == 8.0
+        assert hours[0].get("mean") == 6.0
+        assert hours[0].get("first") == 4.0
+        assert hours[0].get("last") == 8.0
+
+        response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id") + "/rollups",
+            params={**params, "period": "day"},
+        )
+        assert response.status_code == 200
+        days = response.json()
+        assert len(days) == 1
+        assert days[0].get("count") == 4
+        assert days[0].get("last") == 5.0
+
+
+def test_find_reading_rollups_same_time():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
         ).json()
-        start = new_reading.get("created_at")
-        end = datetime.now(pytz.timezone("US/Eastern")).strftime(
-            ISO8601_FORMAT
+        new_sensor = client.post(
+            "/sensor/",
+            json={
+                "name": "pH",
+                "garden_id": new_garden.get("_id"),
+            },
+        ).json()
+        for value in [9.0, 5.0]:
+            client.post(
+                "/sensors/logging/",
+                json={
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": value,
+                    "created_at": "2023-02-18T20:01:00.000000-05:00",
+                },
+            )
+        response = client.get(
+            "/sensors/logging/" + new_sensor.get("_id") + "/rollups",
+            params={
+                "start": "2023-02-18T00:00:00.000000-0500",
+                "end": "2023-02-19T00:00:00.000000-0500",
+            },
         )
-        get_reading_response = client.get(
-            "/sensors/logging/"
-            + new_reading.get("sensor_id")
-            + "?start="
-            + start
-            + "&end="
-            + end
+        assert response.status_code == 200
+        hours = response.json()
+        assert len(hours) == 1
+        assert hours[0].get("first") == 9.0
+        assert hours[0].get("last") == 5.0
+
+
+def test_backfill_reading_rollups():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        sensor_id = new_sensor.get("_id")
+        client.portal.call(
+            app.database["readings"].insert_many,
+            [
+                {
+                    "_id": f"backfill_{value}",
+                    "sensor_id": sensor_id,
+                    "value": value,
+                    "created_at": created_at,
+                }
+                for value, created_at in [
+                    (6.0, "2023-01-10T10:05:00+00:00"),
+                    (8.0, "2023-01-10T10:40:00+00:00"),
+                    (5.0, "2023-01-10T12:00:00+00:00"),
+                ]
+            ],
         )
-        assert get_reading_response.status_code == 200
-        assert get_reading_response.json()[0] == new_reading
+        params = {
+            "start": "2023-01-10T00:00:00.000000+0000",
+            "end": "2023-01-11T00:00:00.000000+0000",
+        }
+        response = client.get(
+            "/sensors/logging/" + sensor_id + "/rollups", params=params
+        )
+        assert response.status_code == 404
+
+        for _ in range(2):
+            client.portal.call(backfill, app.database)
+        response = client.get(
+            "/sensors/logging/" + sensor_id + "/rollups", params=params
+        )
+        assert response.status_code == 200
+        hours = response.json()
+        assert [hour.get("count") for hour in hours] == [2, 1]
+        assert hours[0].get("first") == 6.0
+        assert hours[0].get("last") == 8.0
+        response = client.get(
+            "/sensors/logging/" + sensor_id + "/rollups",
+            params={**params, "period": "day"},
+        )
+        assert [day.get("count") for day in response.json()] == [3]
+
+
+def test_find_reading_rollups_invalid_period():
+    with TestClient(app) as client:
+        response = client.get(
+            "/sensors/logging/123456789/rollups", params={"period": "week"}
+        )
+        assert response.status_code == 400
 
 
 def test_find_reading_invalid_time():
@@ -196,6 +1294,92 @@ def test_find_reading_unexisting():
         assert get_reading_response.status_code == 404
 
 
+def test_find_garden_latest():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        new_sa = client.post(
+            "/sa/", json={"name": "light", "garden_id": new_garden.get("_id")}
+        ).json()
+        new_ra = client.post(
+            "/ra/", json={"name": "pump", "sensor_id": new_sensor.get("_id")}
+        ).json()
+        for value, day in [("7", 3), ("6", 1), ("8", 2)]:
+            client.post(
+                "/sensors/logging/",
+                json={
+                    "sensor_id": new_sensor.get("_id"),
+                    "value": value,
+                    "created_at": f"2023-06-0{day}T10:00:00+00:00",
+                },
+            )
+        client.post(
+            "/sa/logging/actions/",
+            json={"actuator_id": new_sa.get("_id"), "data": "on"},
+        )
+        client.post(
+            "/ra/logging/actions/",
+            json={"actuator_id": new_ra.get("_id"), "data": "off"},
+        )
+
+        response = client.get("/garden/" + new_garden.get("_id") + "/latest")
+        assert response.status_code == 200
+        body = response.json()
+        assert [r.get("value") for r in body.get("readings")] == [7]
+        assert [a.get("data") for a in body.get("scheduled_actions")] == ["on"]
+        assert [a.get("data") for a in body.get("reactive_actions")] == ["off"]
+
+
+def test_find_garden_latest_same_time():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        new_sensor = client.post(
+            "/sensor/",
+            json={"name": "pH", "garden_id": new_garden.get("_id")},
+        ).json()
+        for value in ["5.0", "9"]:
+            new_reading = client.post(
+                "/sensors/logging/",
+                json={"sensor_id": new_sensor.get("_id"), "value": value},
+            ).json()
+        response = client.get("/garden/" + new_garden.get("_id") + "/latest")
+        assert [r.get("value") for r in response.json().get("readings")] == [9]
+
+        client.post(
+            "/sensors/logging/",
+            json={
+                "sensor_id": new_sensor.get("_id"),
+                "value": "4",
+                "created_at": new_reading.get("created_at"),
+            },
+        )
+        response = client.get("/garden/" + new_garden.get("_id") + "/latest")
+        assert [r.get("value") for r in response.json().get("readings")] == [4]
+
+
+def test_find_garden_latest_unexisting():
+    with TestClient(app) as client:
+        response = client.get("/garden/unexisting_id/latest")
+        assert response.status_code == 404
+
+
 def test_create_sa_log():
     with TestClient(app) as client:
         new_sa = client.post(
@@ -239,8 +1423,8 @@ def test_create_sa_log_unexisting_actuator_id():
 
 
 def test_list_sa_logs():
-    app.database.drop_collection("scheduled_actions")
     with TestClient(app) as client:
+        client.portal.call(app.database.drop_collection, "scheduled_actions")
         new_sa = client.post(
             "/sa/", json={"name": "Don Quixote", "garden_id": "a47a4b121"}
         ).json()
@@ -362,8 +1546,8 @@ def test_create_ra_log_unexisting_actuator_id():
 
 
 def test_list_ra_logs():
-    app.database.drop_collection("reactive_actions")
     with TestClient(app) as client:
+        client.portal.call(app.database.drop_collection, "reactive_actions")
         new_ra = client.post(
             "/ra/", json={"name": "Don Quixote", "sensor_id": "a47a4b121"}
         ).json()
@@ -0,0 +1,136 @@
+import os
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from app.metrics import CommandMetrics, Metrics, MetricsMiddleware
+from app.routes.metrics import router as metrics_router
+from app.routes.sensor import router as sensor_router
+
+load_dotenv()
+
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+app.include_router(sensor_router, tags=["sensor"], prefix="/sensor")
+app.include_router(metrics_router, tags=["metrics"])
+
+
+@app.on_event("startup")
+async def startup_event():
+    if os.environ["ATLAS_URI"]:
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
+    else:
+        app.mongodb_client = AsyncIOMotorClient()
+    app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.mongodb_client.close()
+
+
+def test_request_metrics():
+    with TestClient(app) as client:
+        client.get("/sensor/unexisting_id")
+        client.get("/sensor/another_unexisting_id")
+        client.get("/unexisting_route")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        lines = response.text.splitlines()
+        assert (
+            'hydrangea_http_requests_total{method="GET",route="/sensor/{id}",'
+            'status="404"} 2'
+        ) in lines
+        assert (
+            'hydrangea_http_requests_total{method="GET",route="unmatched",'
+            'status="404"} 1'
+        ) in lines
+        assert (
+            "hydrangea_http_request_duration_seconds_count"
+            '{method="GET",route="/sensor/{id}"} 2'
+        ) in lines
+
+
+def test_command_metrics():
+    metrics = Metrics()
+    listener = CommandMetrics(metrics)
+    for request_id, name, command in [
+        (1, "find", {"find": "sensors"}),
+        (2, "getMore", {"getMore": 7, "collection": "sensors"}),
+        (3, "ping", {"ping": 1}),
+    ]:
+        listener.started(
+            SimpleNamespace(
+                connection_id=("localhost", 27017),
+                request_id=request_id,
+                command_name=name,
+                command=command,
+            )
+        )
+    for request_id, name in [(1, "find"), (2, "getMore"), (3, "ping")]:
+        listener.succeeded(
+            SimpleNamespace(
+                connection_id=("localhost", 27017),
+                request_id=request_id,
+                command_name=name,
+                duration_micros=1500,
+            )
+        )
+    lines = metrics.render().splitlines()
+    assert (
+        'hydrangea_db_operations_total{collection="sensors",command="find"} 1'
+    ) in lines
+    assert (
+        "hydrangea_db_operations_total"
+        '{collection="sensors",command="getMore"} 1'
+    ) in lines
+    assert not any('command="ping"' in line for line in lines)
+    assert (
+        "hydrangea_db_operation_duration_seconds_bucket"
+        '{collection="sensors",command="find",le="0.0025"} 1'
+    ) in lines
+
+
+def test_route_command_metrics():
+    metrics = Metrics()
+    listener = CommandMetrics(metrics)
+    route_app = FastAPI()
+    route_app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @route_app.get("/garden/{id}")
+    async def find_garden(id: str):
+        for request_id, name, command in [
+            (1, "find", {"find": "gardens"}),
+            (2, "find", {"find": "pods"}),
+            (3, "ping", {"ping": 1}),
+        ]:
+            listener.started(
+                SimpleNamespace(
+                    connection_id=("localhost", 27017),
+                    request_id=request_id,
+                    command_name=name,
+                    command=command,
+                )
+            )
+        return {"_id": id}
+
+    with TestClient(route_app) as client:
+        client.get("/garden/abc")
+        client.get("/garden/def")
+    lines = metrics.render().splitlines()
+    assert (
+        "hydrangea_http_request_db_operations_bucket"
+        '{method="GET",route="/garden/{id}",le="2"} 2'
+    ) in lines
+    assert (
+        "hydrangea_http_request_db_operations_bucket"
+        '{method="GET",route="/garden/{id}",le="1"} 0'
+    ) in lines
+    assert (
+        "hydrangea_http_request_db_operations_sum"
+        '{method="GET",route="/garden/{id}"} 4.0'
+    ) in lines
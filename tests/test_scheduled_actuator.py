@@ -2,7 +2,7 @@ import os
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from app.routes.scheduled_actuator import router as sa_router
 
@@ -15,16 +15,16 @@ app.include_router(sa_router, tags=["scheduled_actuators"], prefix="/sa")
 @app.on_event("startup")
 async def startup_event():
     if os.environ["ATLAS_URI"]:
-        app.mongodb_client = MongoClient(os.environ["ATLAS_URI"])
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
     else:
-        app.mongodb_client = MongoClient()
+        app.mongodb_client = AsyncIOMotorClient()
     app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.database.drop_collection("scheduled_actuators")
     app.mongodb_client.close()
-    app.database.drop_collection("scheduled_actuators")
 
 
 def test_create_sa():
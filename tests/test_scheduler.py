@@ -0,0 +1,263 @@
+from datetime import datetime, timezone
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from app.routes.config import router as config_router
+from app.routes.garden import router as garden_router
+from app.routes.reactive_actuator import router as ra_router
+from app.routes.scheduler import router as scheduler_router
+from app.scheduler import Scheduler, scheduler
+
+load_dotenv()
+
+
+app = FastAPI()
+app.include_router(config_router, tags=["configs"], prefix="/config")
+app.include_router(garden_router, tags=["gardens"], prefix="/garden")
+app.include_router(ra_router, tags=["reactive_actuators"], prefix="/ra")
+app.include_router(scheduler_router, tags=["scheduler"], prefix="/scheduler")
+
+
+@app.on_event("startup")
+async def startup_event():
+    if os.environ["ATLAS_URI"]:
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
+    else:
+        app.mongodb_client = AsyncIOMotorClient()
+    app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await app.database.drop_collection("commands")
+    app.mongodb_client.close()
+
+
+# Ticks a private scheduler at a given time, so tests never move the shared
+# scheduler's clock away from real time.
+def tick(client, clock, at, garden_id):
+    commands = client.portal.call(
+        clock.tick, app.database, datetime.fromisoformat(at).timestamp()
+    )
+    return sorted(
+        (command.get("type"), command.get("ref_id"), command.get("cmd"))
+        for command in commands
+        if command.get("garden_id") == garden_id
+    )
+
+
+def test_tick_scheduler():
+    with TestClient(app) as client:
+        new_ra = client.post(
+            "/ra/", json={"name": "ph down pump", "sensor_id": "ph"}
+        ).json()
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [{"sensor_id": "temp", "interval": 300}],
+                "ra_schedule": [
+                    {
+                        "ra_id": new_ra.get("_id"),
+                        "interval": 600,
+                        "threshold": 7.5,
+                        "duration": 5,
+                        "threshold_type": 1,
+                    }
+                ],
+                "sa_schedule": [
+                    {
+                        "sa_id": "light",
+                        "on": ["2023-02-17T08:00:00+0000"],
+                        "off": ["2023-02-17T08:30:00+0000"],
+                    }
+                ],
+            },
+        ).json()
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": new_config.get("_id"),
+            },
+        ).json()
+        garden_id = new_garden.get("_id")
+
+        clock = Scheduler()
+        assert (
+            tick(client, clock, "2100-05-01T07:59:00+00:00", garden_id) == []
+        )
+        assert tick(client, clock, "2100-05-01T08:00:00+00:00", garden_id) == [
+            ("scheduled actuator", "light", 1),
+            ("sensor", "ph", 1),
+            ("sensor", "temp", 1),
+        ]
+        assert (
+            tick(client, clock, "2100-05-01T08:00:00+00:00", garden_id) == []
+        )
+        assert tick(client, clock, "2100-05-01T08:31:00+00:00", garden_id) == [
+            ("scheduled actuator", "light", 0),
+            ("sensor", "ph", 1),
+            ("sensor", "temp", 1),
+        ]
+
+        assert clock.status().get("jobs") >= 3
+        assert clock.status().get("last_tick") == datetime(
+            2100, 5, 1, 8, 31, tzinfo=timezone.utc
+        )
+
+        scheduler.invalidate()
+        assert client.post("/scheduler/tick").status_code == 200
+        status = client.get("/scheduler/").json()
+        assert status.get("jobs") >= 3
+        assert status.get("last_tick") < "2100"
+
+
+def test_tick_scheduler_twice():
+    with TestClient(app) as client:
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [{"sensor_id": "temp", "interval": 60}],
+                "ra_schedule": [],
+                "sa_schedule": [],
+            },
+        ).json()
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": new_config.get("_id"),
+            },
+        ).json()
+        garden_id = new_garden.get("_id")
+
+        clock = Scheduler()
+        tick(client, clock, "2100-05-02T00:00:30+00:00", garden_id)
+        assert tick(client, clock, "2100-05-02T00:01:30+00:00", garden_id) == [
+            ("sensor", "temp", 1)
+        ]
+        # Another process running the same ticks must not queue them again.
+        other = Scheduler()
+        client.portal.call(
+            other.tick,
+            app.database,
+            datetime(2100, 5, 2, 0, 0, 30, tzinfo=timezone.utc).timestamp(),
+        )
+        commands = client.portal.call(
+            other.tick,
+            app.database,
+            datetime(2100, 5, 2, 0, 1, 30, tzinfo=timezone.utc).timestamp(),
+        )
+        assert [c for c in commands if c["garden_id"] == garden_id] == []
+
+
+def test_tick_scheduler_shared_sensor():
+    with TestClient(app) as client:
+        new_ra = client.post(
+            "/ra/", json={"name": "ph down pump", "sensor_id": "shared_ph"}
+        ).json()
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [
+                    {"sensor_id": "shared_ph", "interval": 300}
+                ],
+                "ra_schedule": [
+                    {
+                        "ra_id": new_ra.get("_id"),
+                        "interval": 1200,
+                        "threshold": 7.5,
+                        "duration": 5,
+                        "threshold_type": 1,
+                    }
+                ],
+                "sa_schedule": [],
+            },
+        ).json()
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": new_config.get("_id"),
+            },
+        ).json()
+        garden_id = new_garden.get("_id")
+
+        clock = Scheduler()
+        tick(client, clock, "2100-05-03T00:00:30+00:00", garden_id)
+        assert tick(client, clock, "2100-05-03T00:05:30+00:00", garden_id) == [
+            ("sensor", "shared_ph", 1)
+        ]
+        assert tick(client, clock, "2100-05-03T00:10:30+00:00", garden_id) == [
+            ("sensor", "shared_ph", 1)
+        ]
+
+
+def test_tick_scheduler_malformed_config():
+    with TestClient(app) as client:
+        client.portal.call(
+            app.database["configs"].insert_many,
+            [
+                {"_id": "malformed_config", "sa_schedule": [{"sa_id": "fan"}]},
+                {
+                    "_id": "malformed_ra_config",
+                    "ra_schedule": [{"interval": 60}],
+                },
+            ],
+        )
+        for config_id in ["malformed_config", "malformed_ra_config"]:
+            client.post(
+                "/garden/",
+                json={
+                    "name": "Sancho Panza",
+                    "location": "Miguel de Cervantes",
+                    "config_id": config_id,
+                },
+            )
+        new_config = client.post(
+            "/config/",
+            json={
+                "name": "Config",
+                "sensor_schedule": [{"sensor_id": "soil", "interval": 60}],
+                "ra_schedule": [],
+                "sa_schedule": [],
+            },
+        ).json()
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": new_config.get("_id"),
+            },
+        ).json()
+
+        other = Scheduler()
+        client.portal.call(
+            other.tick,
+            app.database,
+            datetime(2100, 5, 4, 0, 0, 30, tzinfo=timezone.utc).timestamp(),
+        )
+        commands = client.portal.call(
+            other.tick,
+            app.database,
+            datetime(2100, 5, 4, 0, 1, 30, tzinfo=timezone.utc).timestamp(),
+        )
+        assert [
+            c["ref_id"]
+            for c in commands
+            if c["garden_id"] == new_garden.get("_id")
+        ] == ["soil"]
+        client.portal.call(
+            app.database["configs"].delete_many,
+            {"_id": {"$in": ["malformed_config", "malformed_ra_config"]}},
+        )
@@ -1,7 +1,7 @@
 import os
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from app.routes.sensor import router as sensor_router
 from app.routes.garden import router as garden_router
@@ -17,16 +17,16 @@ app.include_router(garden_router, tags=["garden"], prefix="/garden")
 @app.on_event("startup")
 async def startup_event():
     if os.environ["ATLAS_URI"]:
-        app.mongodb_client = MongoClient(os.environ["ATLAS_URI"])
+        app.mongodb_client = AsyncIOMotorClient(os.environ["ATLAS_URI"])
     else:
-        app.mongodb_client = MongoClient()
+        app.mongodb_client = AsyncIOMotorClient()
     app.database = app.mongodb_client[os.environ["DB_NAME"] + "test"]
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.database.drop_collection("sensors")
     app.mongodb_client.close()
-    app.database.drop_collection("sensors")
 
 
 def test_create_sensor():
@@ -130,6 +130,51 @@ def test_update_sensor_unexisting():
         assert update_sensor_response.status_code == 404
 
 
+def test_list_sensors_by_garden():
+    with TestClient(app) as client:
+        new_garden = client.post(
+            "/garden/",
+            json={
+                "name": "Don Quixote",
+                "location": "Miguel de Cervantes",
+                "config_id": "abc",
+            },
+        ).json()
+        for name in ["Humidity", "pH"]:
+            client.post(
+                "/sensor/",
+                json={"name": name, "garden_id": new_garden.get("_id")},
+            )
+
+        response = client.get(
+            "/sensor/",
+            params={
+                "garden_id": new_garden.get("_id"),
+                "fields": "_id,name",
+                "limit": 5,
+            },
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert sorted(sensor.get("name") for sensor in body) == [
+            "Humidity",
+            "pH",
+        ]
+        assert all(set(sensor) == {"_id", "name"} for sensor in body)
+
+        response = client.get(
+            "/sensor/", params={"garden_id": new_garden.get("_id"), "limit": 1}
+        )
+        assert len(response.json()) == 1
+        assert response.json()[0].get("garden_id") == new_garden.get("_id")
+
+
+def test_list_sensors_invalid_fields():
+    with TestClient(app) as client:
+        response = client.get("/sensor/", params={"fields": "password"})
+        assert response.status_code == 400
+
+
 def test_delete_sensor():
     with TestClient(app) as client:
         new_sensor = client.post(